@@ -1,32 +1,37 @@
 from __future__ import annotations
 
 import io
-from typing import Optional
 
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font
+from openpyxl.utils import get_column_letter
 
 
-def _coerce_price(value: Optional[str]) -> float:
-    if not value:
-        return 0.0
-    s = str(value)
-    for tok in ["Rs", "$", "USD", "LKR", ","]:
-        s = s.replace(tok, "")
-    try:
-        return float(s.strip())
-    except Exception:
-        return 0.0
+_PRICE_TOKENS_RE = r"Rs|\$|USD|LKR|,"
+_HEADER_FONT = Font(bold=True)
+
+
+def _coerce_prices(values: pd.Series) -> pd.Series:
+    # Strip common currency tokens column-wide; unparseable or missing prices become 0.0
+    cleaned = values.astype("string").str.replace(_PRICE_TOKENS_RE, "", regex=True).str.strip()
+    return pd.to_numeric(cleaned, errors="coerce").fillna(0.0).astype(float)
+
+
+def _max_text_len(values: pd.Series) -> int:
+    lengths = values.astype(str).str.len().where(values.notna(), 0)
+    return int(lengths.max()) if len(lengths) else 0
 
 
 def build_budget_excel(bom_df: pd.DataFrame, results_df: pd.DataFrame) -> bytes:
-    df = results_df.copy()
-    bom_view = bom_df.copy()
-    bom_view["_join_key"] = bom_view["Part_Name"].fillna("")
-    df["_join_key"] = df["BOM Part Name"].fillna("")
-    merged = pd.merge(df, bom_view[["_join_key", "Quantity"]], on="_join_key", how="left")
+    # Only the join key and quantity are needed from the BOM; avoid copying either full frame
+    df = results_df.assign(_join_key=results_df["BOM Part Name"].fillna(""))
+    bom_view = pd.DataFrame({"_join_key": bom_df["Part_Name"].fillna(""), "Quantity": bom_df["Quantity"]})
+    merged = pd.merge(df, bom_view, on="_join_key", how="left")
     merged["Quantity"] = merged["Quantity"].fillna(0).astype(int)
 
-    merged["Unit Price"] = merged["Price"].apply(_coerce_price)
+    merged["Unit Price"] = _coerce_prices(merged["Price"])
     merged["Total Price"] = merged["Unit Price"] * merged["Quantity"]
 
     # Reorder columns
@@ -47,42 +52,50 @@ def build_budget_excel(bom_df: pd.DataFrame, results_df: pd.DataFrame) -> bytes:
             merged[c] = None
     budget_df = merged[cols]
 
-    # Write to Excel with a summary total row
+    # Write-only workbook: rows are serialized as they are appended instead of being held as
+    # one Cell object per value; widths and styles are set up front since cells can't be revisited
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Budget")
+    title = "BOM Budget (v1.0)"
+    # Autosize columns (basic) from the frame instead of walking every openpyxl cell
+    for col_idx, c in enumerate(budget_df.columns, start=1):
+        max_len = max(len(str(c)), _max_text_len(budget_df[c]))
+        if col_idx == 1:
+            max_len = max(max_len, len(title))
+        ws.column_dimensions[get_column_letter(col_idx)].width = min(max(12, max_len + 2), 60)
+
+    # Row 1 holds the title, row 2 the bold header
+    ws.append([title])
+    header = []
+    for c in budget_df.columns:
+        cell = WriteOnlyCell(ws, value=c)
+        cell.font = _HEADER_FONT
+        header.append(cell)
+    ws.append(header)
+    values = budget_df.astype(object).where(budget_df.notna(), None)
+    for row in values.itertuples(index=False, name=None):
+        ws.append(row)
+
+    # Append overall total one blank row below the data
+    last_data_row = len(budget_df) + 2
+    total_row_idx = last_data_row + 2
+    total_row = ["Overall Total Cost"]
+    total_col_idx = None
+    for idx, c in enumerate(budget_df.columns, start=1):
+        if str(c).strip().lower() == "total price":
+            total_col_idx = idx
+            break
+    if total_col_idx:
+        start = 3  # data starts at row 3 due to the title row
+        letter = get_column_letter(total_col_idx)
+        # End at the last data row so the total never sums itself (an empty budget sums the blank spacer)
+        end = max(start, last_data_row)
+        total_cell = WriteOnlyCell(ws, value=f"=SUM({letter}{start}:{letter}{end})")
+        total_cell.alignment = Alignment(horizontal="right")
+        total_row += [None] * (total_col_idx - 2) + [total_cell]
+    ws.append([])
+    ws.append(total_row)
+
     buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        budget_df.to_excel(writer, sheet_name="Budget", index=False)
-        ws = writer.sheets["Budget"]
-        # Add header with version
-        ws.insert_rows(1)
-        ws["A1"] = "BOM Budget (v1.0)"
-        # Bold header row (now row 2)
-        from openpyxl.styles import Font, Alignment
-        header_font = Font(bold=True)
-        for cell in ws[2]:
-            cell.font = header_font
-        # Autosize columns (basic)
-        for col in ws.columns:
-            max_len = 0
-            col_letter = col[0].column_letter
-            for cell in col:
-                try:
-                    max_len = max(max_len, len(str(cell.value)) if cell.value is not None else 0)
-                except Exception:
-                    pass
-            ws.column_dimensions[col_letter].width = min(max(12, max_len + 2), 60)
-        # Append overall total
-        total_row_idx = ws.max_row + 2
-        ws.cell(row=total_row_idx, column=1, value="Overall Total Cost")
-        # Find Total Price column index
-        total_col_idx = None
-        for idx, cell in enumerate(ws[2], start=1):
-            if str(cell.value).strip().lower() == "total price":
-                total_col_idx = idx
-                break
-        if total_col_idx:
-            start = 3  # data starts at row 3 due to inserted title row
-            end = ws.max_row
-            ws.cell(row=total_row_idx, column=total_col_idx, value=f"=SUM({ws.cell(row=start, column=total_col_idx).coordinate}:{ws.cell(row=end, column=total_col_idx).coordinate})")
-            ws.cell(row=total_row_idx, column=total_col_idx).alignment = Alignment(horizontal="right")
-    buf.seek(0)
-    return buf.read()
\ No newline at end of file
+    wb.save(buf)
+    return buf.getvalue()
\ No newline at end of file
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import os
+import threading
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Iterator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 
 from .models import Base
@@ -13,33 +14,72 @@ from .models import Base
 DATA_DIR = Path("data")
 DB_PATH = DATA_DIR / "cache.db"
 
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+]
+
 _engine = None
 _SessionLocal = None
+# Streamlit script threads and the background scraper can race to build the engine; one pool per process
+_init_lock = threading.Lock()
 
 
 def _get_engine():
     global _engine
-    if _engine is None:
+    if _engine is not None:
+        return _engine
+    with _init_lock:
+        if _engine is not None:
+            return _engine
         os.makedirs(DATA_DIR, exist_ok=True)
-        _engine = create_engine(f"sqlite:///{DB_PATH}", future=True, echo=False)
+        engine = create_engine(
+            f"sqlite:///{DB_PATH}",
+            future=True,
+            echo=False,
+            # Rows per multi-VALUES INSERT when executing Core inserts with many parameter sets
+            insertmanyvalues_page_size=1000,
+        )
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        _engine = engine
     return _engine
 
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # WAL lets the background scraper write while the UI reads; the cache/mmap
+    # sizes keep the parts table in memory for repeated matching scans
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
 def ensure_db_initialized() -> None:
     engine = _get_engine()
     Base.metadata.create_all(bind=engine)
+    # create_all skips indexes on tables that already exist; add any new ones
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 
 def _get_session_factory():
     global _SessionLocal
-    if _SessionLocal is None:
-        _SessionLocal = sessionmaker(
-            bind=_get_engine(),
-            autoflush=False,
-            autocommit=False,
-            expire_on_commit=False,
-            future=True,
-        )
+    if _SessionLocal is not None:
+        return _SessionLocal
+    engine = _get_engine()
+    with _init_lock:
+        if _SessionLocal is None:
+            _SessionLocal = sessionmaker(
+                bind=engine,
+                autoflush=False,
+                autocommit=False,
+                expire_on_commit=False,
+                future=True,
+            )
     return _SessionLocal
 
 
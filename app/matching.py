@@ -1,15 +1,54 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple, Any, Optional
+import hashlib
+import json
+import os
+import pickle
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Any, Optional
+from urllib.parse import quote
 
+import numpy as np
 import pandas as pd
 from rapidfuzz import fuzz
+from rapidfuzz.process import cdist
+from scipy.sparse import csr_matrix
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session
 
+from .db import DATA_DIR
 from .models import Part, Supplier, SupplierRule
 
+# Case-insensitive substrings of Part.stock that count as in stock
+IN_STOCK_TOKENS = ["in stock", "available", "+", ">", "stock:"]
+# Ranked candidates kept per BOM row (best match + pool for up to 20 unique suggestions)
+TOP_K = 50
+# Part columns loaded for matching, each consumed into a per-column list
+CANDIDATE_COLUMNS = [
+    Part.id,
+    Part.supplier_id,
+    Part.part_number,
+    Part.name,
+    Part.description,
+    Part.package,
+    Part.voltage,
+    Part.other_specs,
+    Part.stock,
+    Part.price_tiers_json,
+    Part.datasheet_url,
+    Part.purchase_url,
+    Part.image_url,
+]
+# Fitted parts TF-IDF, one file per filter combination, reused across runs while the catalog is unchanged
+TFIDF_CACHE_DIR = DATA_DIR
+
+_WS_RE = re.compile(r"\s+")
+
 
 class BomRow:
     def __init__(
@@ -29,42 +68,151 @@ class BomRow:
         self.other_specs = other_specs
 
 
+def _text_column(df: pd.DataFrame, column: str) -> List[Optional[str]]:
+    """Stripped string values of a column, None for missing cells (or a missing column)."""
+    if column not in df.columns:
+        return [None] * len(df)
+    values = df[column]
+    return values.astype(str).str.strip().astype(object).where(values.notna(), None).tolist()
+
+
+def _quantity_column(df: pd.DataFrame, column: str) -> List[Optional[int]]:
+    if column not in df.columns:
+        return [None] * len(df)
+    values = pd.to_numeric(df[column], errors="coerce")
+    return [int(v) if pd.notna(v) else None for v in values.tolist()]
+
+
+@lru_cache(maxsize=8192, typed=True)
 def _normalize_text(value: Optional[str]) -> str:
     if not value:
         return ""
-    return " ".join(str(value).lower().split())
+    return _WS_RE.sub(" ", str(value).lower()).strip()
+
+
+def _name_similarity_matrix(bom_names: List[str], part_names: List[str]) -> np.ndarray:
+    """Dense BOM x part Levenshtein ratio (0-100), computed in one multi-threaded rapidfuzz call."""
+    if not bom_names or not part_names:
+        return np.zeros((len(bom_names), len(part_names)), dtype=np.float32)
+    scores = cdist(bom_names, part_names, scorer=fuzz.ratio, dtype=np.float32, workers=-1)
+    # An empty name on either side never scores
+    scores[[not n for n in bom_names], :] = 0.0
+    scores[:, [not n for n in part_names]] = 0.0
+    return scores
+
+
+def _spec_text(*values: Optional[str]) -> str:
+    return " ".join(t for t in (_normalize_text(v) for v in values) if t)
+
+
+def catalog_version(session: Session) -> Tuple[Any, ...]:
+    """Cheap (count, newest update, newest id) token that changes whenever parts are added, rescraped or removed."""
+    count, last_updated, max_id = session.query(
+        func.count(Part.id), func.max(Part.last_updated), func.max(Part.id)
+    ).one()
+    return (count, str(last_updated), max_id)
+
+
+def _catalog_fingerprint(session: Session, in_stock_only: bool, supplier_filter: Optional[List[str]]) -> Tuple[Any, ...]:
+    """Cheap (filters, catalog version) key that changes whenever the candidate parts (and so the TF-IDF fit) could change."""
+    return (bool(in_stock_only), tuple(sorted(supplier_filter or []))), catalog_version(session)
+
 
+def _tfidf_cache_path(cache_key: Tuple[Any, ...]) -> Path:
+    # Named by the filters only: a new catalog version overwrites the file instead of adding one
+    digest = hashlib.sha1(repr(cache_key[0]).encode("utf-8")).hexdigest()[:16]
+    return TFIDF_CACHE_DIR / f"tfidf-{digest}.pkl"
 
-def _levenshtein_similarity(a: str, b: str) -> float:
-    if not a or not b:
-        return 0.0
-    return float(fuzz.ratio(a, b))
 
+def _ids_digest(part_ids: List[int]) -> str:
+    return hashlib.sha1(np.asarray(part_ids, dtype=np.int64).tobytes()).hexdigest()
 
-def _tfidf_cosine_similarity(text_a: str, text_b: str) -> float:
-    if not text_a and not text_b:
-        return 0.0
+
+def _fit_parts_tfidf(
+    part_texts: List[str], cache_key: Optional[Tuple[Any, ...]], part_ids: Optional[List[int]] = None
+) -> Optional[Tuple[TfidfVectorizer, csr_matrix]]:
+    # Only cache when the rows can be checked against the pickled matrix by id, not just by count
+    use_cache = cache_key is not None and part_ids is not None and len(part_ids) == len(part_texts)
+    if use_cache:
+        cache_path = _tfidf_cache_path(cache_key)
+        ids_digest = _ids_digest(part_ids)
+        try:
+            with open(cache_path, "rb") as fh:
+                cached = pickle.load(fh)
+            if cached.get("key") == cache_key and cached.get("ids") == ids_digest:
+                return cached["vectorizer"], cached["matrix"]
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Missing, truncated or stale-format cache file: refit below
+            pass
     vect = TfidfVectorizer(stop_words="english")
-    mat = vect.fit_transform([text_a, text_b])
-    sim = cosine_similarity(mat[0:1], mat[1:2]).ravel()[0]
-    return float(sim * 100.0)
+    try:
+        part_matrix = vect.fit_transform(part_texts)
+    except ValueError:
+        # Empty vocabulary: no part carries any usable spec text
+        return None
+    if use_cache:
+        tmp_path = None
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, prefix=".tfidf-", suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(
+                    {"key": cache_key, "ids": ids_digest, "vectorizer": vect, "matrix": part_matrix},
+                    fh,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+    return vect, part_matrix
+
 
+def _tfidf_similarity_matrix(
+    bom_texts: List[str],
+    part_texts: List[str],
+    cache_key: Optional[Tuple[Any, ...]] = None,
+    part_ids: Optional[List[int]] = None,
+) -> csr_matrix:
+    """Sparse BOM x part cosine similarity (0-100) from a single TF-IDF fit over the parts corpus.
 
-def compute_name_similarity(bom: BomRow, part: Part) -> float:
-    a = _normalize_text(bom.part_name)
-    b = _normalize_text(part.name)
-    return _levenshtein_similarity(a, b)
+    When cache_key and the part ids behind part_texts are given, the fitted vectorizer and
+    parts matrix are reused from disk across runs until the key or the id sequence changes.
+    """
+    empty = csr_matrix((len(bom_texts), len(part_texts)))
+    if not bom_texts or not part_texts:
+        return empty
+    fitted = _fit_parts_tfidf(part_texts, cache_key, part_ids)
+    if fitted is None:
+        return empty
+    vect, part_matrix = fitted
+    bom_matrix = vect.transform(bom_texts)
+    # Rows are already L2-normalized, so the dot product is the cosine similarity
+    return (bom_matrix @ part_matrix.T).tocsr() * 100.0
 
 
-def _purchase_link_or_fallback(session: Session, part: Part, default_query: Optional[str]) -> Optional[str]:
-    if part.purchase_url:
-        return part.purchase_url
-    supplier = session.get(Supplier, part.supplier_id)
+@lru_cache(maxsize=8192)
+def _quote_query(query: str) -> str:
+    return quote(query)
+
+
+def _purchase_link_or_fallback(
+    purchase_url: Optional[str],
+    supplier_id: int,
+    default_query: Optional[str],
+    suppliers_by_id: Dict[int, Supplier],
+    rules_by_supplier: Dict[int, SupplierRule],
+) -> Optional[str]:
+    if purchase_url:
+        return purchase_url
+    supplier = suppliers_by_id.get(supplier_id)
     # Try rule search template
-    rule = session.query(SupplierRule).filter_by(supplier_id=part.supplier_id).first()
+    rule = rules_by_supplier.get(supplier_id)
     if rule and rule.search_url_template and default_query:
-        from requests.utils import quote
-        return rule.search_url_template.replace("{query}", quote(default_query))
+        return rule.search_url_template.replace("{query}", _quote_query(default_query))
     # Fallback to supplier base_url
     return supplier.base_url if supplier and supplier.base_url else None
 
@@ -75,70 +223,119 @@ def find_best_matches_for_bom(
     min_similarity: int = 70,
     in_stock_only: bool = False,
     supplier_filter: Optional[List[str]] = None,
+    progress_cb: Optional[Callable[[float], None]] = None,
 ) -> Tuple[pd.DataFrame, Dict[int, List[Dict[str, Any]]]]:
-    query = session.query(Part).join(Supplier)
+    """Best match and up to 20 suggestions per BOM row.
+
+    progress_cb, when given, receives the percentage of BOM rows scored (0-100), at most
+    about a hundred times per call and always ending at 100.
+    """
+    # Plain column rows fetched in chunks: no ORM identity map or object construction per part
+    stmt = select(*CANDIDATE_COLUMNS).join(Supplier).where(Part.name.isnot(None), Part.name != "")
     if supplier_filter:
-        query = query.filter(Supplier.name.in_(supplier_filter))
-    parts: List[Part] = query.all()
+        stmt = stmt.where(Supplier.name.in_(supplier_filter))
+    if in_stock_only:
+        stmt = stmt.where(or_(*(Part.stock.ilike(f"%{token}%") for token in IN_STOCK_TOKENS)))
+    # Stable row order: the cached TF-IDF matrix is aligned to candidates by position
+    stmt = stmt.order_by(Part.id)
+    # Each chunk is consumed straight into per-column lists (indexed by candidate position); the
+    # spec columns only survive as the joined spec text, and no Row is kept past its chunk
+    part_ids: List[int] = []
+    part_supplier_ids: List[int] = []
+    part_names: List[Optional[str]] = []
+    part_name_texts: List[str] = []
+    part_spec_texts: List[str] = []
+    part_stocks: List[Optional[str]] = []
+    part_prices: List[Optional[str]] = []
+    part_datasheets: List[Optional[str]] = []
+    part_purchase_urls: List[Optional[str]] = []
+    part_images: List[Optional[str]] = []
+    for p in session.execute(stmt.execution_options(yield_per=5000)):
+        part_ids.append(p.id)
+        part_supplier_ids.append(p.supplier_id)
+        part_names.append(p.name)
+        part_name_texts.append(_normalize_text(p.name))
+        part_spec_texts.append(_spec_text(p.description, p.package, p.voltage, p.other_specs))
+        part_stocks.append(p.stock)
+        part_prices.append(p.price_tiers_json)
+        part_datasheets.append(p.datasheet_url)
+        part_purchase_urls.append(p.purchase_url)
+        part_images.append(p.image_url)
+
+    # Prefetch suppliers and their first rule once instead of per result/suggestion row
+    suppliers_by_id: Dict[int, Supplier] = {sup.id: sup for sup in session.query(Supplier).all()}
+    rules_by_supplier: Dict[int, SupplierRule] = {}
+    for rule in session.query(SupplierRule).order_by(SupplierRule.id):
+        rules_by_supplier.setdefault(rule.supplier_id, rule)
 
     results: List[Dict[str, Any]] = []
     suggestions_map: Dict[int, List[Dict[str, Any]]] = {}
 
-    for idx, row in bom_df.iterrows():
-        name = row.get("Part_Name")
-        name = str(name).strip() if pd.notna(name) else None
-        bom = BomRow(
-            part_name=name,
-            description=str(row.get("Description")).strip() if pd.notna(row.get("Description")) else None,
-            quantity=int(row.get("Quantity")) if pd.notna(row.get("Quantity")) else None,
-            package=str(row.get("Package")).strip() if pd.notna(row.get("Package")) else None,
-            voltage=str(row.get("Voltage")).strip() if pd.notna(row.get("Voltage")) else None,
-            other_specs=str(row.get("Other_Specs")).strip() if pd.notna(row.get("Other_Specs")) else None,
+    bom_rows: List[Tuple[Any, BomRow]] = [
+        (idx, BomRow(*fields))
+        for idx, fields in zip(
+            bom_df.index,
+            zip(
+                _text_column(bom_df, "Part_Name"),
+                _text_column(bom_df, "Description"),
+                _quantity_column(bom_df, "Quantity"),
+                _text_column(bom_df, "Package"),
+                _text_column(bom_df, "Voltage"),
+                _text_column(bom_df, "Other_Specs"),
+            ),
         )
+    ]
 
-        def stock_ok(p: Part) -> bool:
-            if not in_stock_only:
-                return True
-            if not p.stock:
-                return False
-            return any(s in p.stock.lower() for s in ["in stock", "available", "+", ">", "stock:"])
-
-        candidates = [p for p in parts if stock_ok(p) and p.name]
+    name_sims = _name_similarity_matrix(
+        [_normalize_text(b.part_name) for _, b in bom_rows],
+        part_name_texts,
+    )
+    # Fit TF-IDF once over all candidate specs and score every BOM row in one sparse matmul
+    spec_sims = _tfidf_similarity_matrix(
+        [_spec_text(b.description, b.package, b.voltage, b.other_specs) for _, b in bom_rows],
+        part_spec_texts,
+        cache_key=_catalog_fingerprint(session, in_stock_only, supplier_filter),
+        part_ids=part_ids,
+    )
 
-        scored: List[Tuple[Part, float]] = []
+    def score_row(row_pos: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        bom = bom_rows[row_pos][1]
+        scored: List[Tuple[int, float]] = []
         if bom.part_name:
-            for p in candidates:
-                score = compute_name_similarity(bom, p)
-                if score > 0:
-                    spec_sim = _tfidf_cosine_similarity(
-                        _normalize_text(bom.description),
-                        _normalize_text(p.description),
-                    )
-                    total = 0.9 * score + 0.1 * spec_sim
-                    scored.append((p, total))
-        else:
-            scored = []
-
-        scored.sort(key=lambda x: x[1], reverse=True)
+            row_name_sims = name_sims[row_pos].astype(np.float64)
+            row_spec_sims = spec_sims.getrow(row_pos).toarray().ravel()
+            totals = 0.9 * row_name_sims + 0.1 * row_spec_sims
+            top = np.flatnonzero(row_name_sims > 0)
+            # Only the best TOP_K are ever used, so partially select before sorting
+            if len(top) > TOP_K:
+                top = np.sort(top[np.argpartition(-totals[top], TOP_K - 1)[:TOP_K]])
+            top = top[np.argsort(-totals[top], kind="stable")]
+            scored = [(int(pos), float(totals[pos])) for pos in top]
 
         best = scored[0] if scored else (None, 0.0)
         if best[0] is not None and best[1] >= min_similarity:
-            part = best[0]
-            supplier_name = session.get(Supplier, part.supplier_id).name
-            results.append({
+            pos = best[0]
+            supplier_id = part_supplier_ids[pos]
+            result = {
                 "Status": "Available",
                 "BOM Part Name": bom.part_name,
-                "Found Part Name": part.name,
-                "Supplier": supplier_name,
-                "Price": _extract_primary_price(part.price_tiers_json),
-                "Stock Availability": part.stock,
-                "Image": part.image_url,
-                "Datasheet Link": part.datasheet_url,
-                "Purchase Link": _purchase_link_or_fallback(session, part, default_query=part.name or bom.part_name),
+                "Found Part Name": part_names[pos],
+                "Supplier": suppliers_by_id[supplier_id].name,
+                "Price": _extract_primary_price(part_prices[pos]),
+                "Stock Availability": part_stocks[pos],
+                "Image": part_images[pos],
+                "Datasheet Link": part_datasheets[pos],
+                "Purchase Link": _purchase_link_or_fallback(
+                    part_purchase_urls[pos],
+                    supplier_id,
+                    part_names[pos] or bom.part_name,
+                    suppliers_by_id,
+                    rules_by_supplier,
+                ),
                 "Similarity %": round(best[1], 1),
-            })
+            }
         else:
-            results.append({
+            result = {
                 "Status": "Unavailable",
                 "BOM Part Name": bom.part_name,
                 "Found Part Name": None,
@@ -149,30 +346,48 @@ def find_best_matches_for_bom(
                 "Datasheet Link": None,
                 "Purchase Link": None,
                 "Similarity %": round(best[1], 1) if best[0] is not None else 0.0,
-            })
+            }
 
         # Suggestions: top 20 unique by name+supplier+link
         alt = []
         seen = set()
-        for p, s in scored[:50]:
-            sup = session.get(Supplier, p.supplier_id).name
-            link = _purchase_link_or_fallback(session, p, default_query=p.name)
-            key = (sup, p.name, link)
+        for pos, s in scored:
+            name = part_names[pos]
+            supplier_id = part_supplier_ids[pos]
+            sup = suppliers_by_id[supplier_id].name
+            link = _purchase_link_or_fallback(part_purchase_urls[pos], supplier_id, name, suppliers_by_id, rules_by_supplier)
+            key = (sup, name, link)
             if key in seen:
                 continue
             seen.add(key)
             alt.append({
-                "found_part_name": p.name,
+                "found_part_name": name,
                 "supplier": sup,
-                "price": _extract_primary_price(p.price_tiers_json),
-                "stock": p.stock,
-                "image": p.image_url,
-                "datasheet_link": p.datasheet_url,
+                "price": _extract_primary_price(part_prices[pos]),
+                "stock": part_stocks[pos],
+                "image": part_images[pos],
+                "datasheet_link": part_datasheets[pos],
                 "purchase_link": link,
                 "similarity": round(float(s), 1),
             })
             if len(alt) >= 20:
                 break
+        return result, alt
+
+    # Per-row work is independent and mostly in NumPy/SciPy, so threads overlap well;
+    # map() keeps results in BOM order
+    scored_rows: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]] = []
+    step = max(1, -(-len(bom_rows) // 100))  # ceil: at most ~100 reports
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+        for done, scored_row in enumerate(ex.map(score_row, range(len(bom_rows))), start=1):
+            scored_rows.append(scored_row)
+            if progress_cb is not None and done % step == 0 and done < len(bom_rows):
+                progress_cb(100.0 * done / len(bom_rows))
+    if progress_cb is not None:
+        # Always reported, even for an empty BOM
+        progress_cb(100.0)
+    for (idx, _), (result, alt) in zip(bom_rows, scored_rows):
+        results.append(result)
         if alt:
             suggestions_map[idx] = alt
 
@@ -180,11 +395,12 @@ def find_best_matches_for_bom(
     return df, suggestions_map
 
 
+@lru_cache(maxsize=65536)
 def _extract_primary_price(price_json: Optional[str]) -> Optional[str]:
+    # Cached on the raw JSON string: the same part recurs across results and suggestions
     if not price_json:
         return None
     try:
-        import json
         tiers = json.loads(price_json)
         if isinstance(tiers, list) and tiers:
             return tiers[0].get("price") or tiers[0].get("unit_price") or None
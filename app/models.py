@@ -68,7 +68,7 @@ class Part(Base):
     supplier_id = Column(Integer, ForeignKey("suppliers.id"), nullable=False, index=True)
 
     part_number = Column(String(255), nullable=True, index=True)
-    name = Column(String(512), nullable=True)
+    name = Column(String(512), nullable=True, index=True)
     description = Column(Text, nullable=True)
     package = Column(String(255), nullable=True)
     voltage = Column(String(255), nullable=True)
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import io
-from typing import Optional
 
 import pandas as pd
 from reportlab.lib import colors
@@ -11,30 +10,25 @@ from reportlab.lib.units import mm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 
 
-def _coerce_price(value: Optional[str]) -> float:
-    if not value:
-        return 0.0
-    s = str(value)
-    # Remove common currency tokens
-    for tok in ["Rs", "$", "USD", "LKR", ","]:
-        s = s.replace(tok, "")
-    try:
-        return float(s.strip())
-    except Exception:
-        return 0.0
+_PRICE_TOKENS_RE = r"Rs|\$|USD|LKR|,"
+
+
+def _coerce_prices(values: pd.Series) -> pd.Series:
+    # Strip common currency tokens column-wide; unparseable or missing prices become 0.0
+    cleaned = values.astype("string").str.replace(_PRICE_TOKENS_RE, "", regex=True).str.strip()
+    return pd.to_numeric(cleaned, errors="coerce").fillna(0.0).astype(float)
 
 
 def build_budget_pdf(bom_df: pd.DataFrame, results_df: pd.DataFrame) -> bytes:
     # Merge to get quantities alongside matches
-    df = results_df.copy()
-    bom_view = bom_df.copy()
-    bom_view["_join_key"] = bom_view["Part_Name"].fillna("")
-    df["_join_key"] = df["BOM Part Name"].fillna("")
-    merged = pd.merge(df, bom_view[["_join_key", "Quantity"]], on="_join_key", how="left")
+    # Only the join key and quantity are needed from the BOM; avoid copying either full frame
+    df = results_df.assign(_join_key=results_df["BOM Part Name"].fillna(""))
+    bom_view = pd.DataFrame({"_join_key": bom_df["Part_Name"].fillna(""), "Quantity": bom_df["Quantity"]})
+    merged = pd.merge(df, bom_view, on="_join_key", how="left")
     merged["Quantity"] = merged["Quantity"].fillna(0).astype(int)
 
     # Unit Price from parts list Price column
-    merged["Unit Price"] = merged["Price"].apply(_coerce_price)
+    merged["Unit Price"] = _coerce_prices(merged["Price"])
     # Total Price per component
     merged["Total Price"] = merged["Unit Price"] * merged["Quantity"]
     overall_total = float(merged["Total Price"].sum())
@@ -82,20 +76,14 @@ def build_budget_pdf(bom_df: pd.DataFrame, results_df: pd.DataFrame) -> bytes:
         "Total Price",
         "Purchase Link",
     ]
-    table_data = [columns]
-    for _, r in merged.iterrows():
-        table_data.append(
-            [
-                str(r.get("BOM Part Name", "")),
-                str(r.get("Found Part Name", "")),
-                str(r.get("Supplier", "")),
-                int(r.get("Quantity", 0)),
-                str(r.get("Price", "")),
-                f"{float(r.get('Unit Price', 0.0)):.2f}",
-                f"{float(r.get('Total Price', 0.0)):.2f}",
-                str(r.get("Purchase Link", "")),
-            ]
-        )
+    # Format whole columns up front, blank out missing cells in one pass,
+    # and hand ReportLab plain row lists
+    table_df = merged.reindex(columns=columns)
+    table_df["Quantity"] = table_df["Quantity"].astype(int)
+    table_df["Unit Price"] = table_df["Unit Price"].map("{:.2f}".format)
+    table_df["Total Price"] = table_df["Total Price"].map("{:.2f}".format)
+    table_df = table_df.astype(object).where(table_df.notna(), "")
+    table_data = [columns] + table_df.to_numpy().tolist()
 
     table = Table(table_data, repeatRows=1)
     table.setStyle(
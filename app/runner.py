@@ -2,15 +2,59 @@ from __future__ import annotations
 
 import json
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Tuple, Any
 
 from sqlalchemy.orm import Session
 
+from .db import DATA_DIR
 from .models import Supplier, SupplierRule, Part
 from .scheduler import write_progress, set_last_update_time
+from .scrapers.base import PageCache
 from .scrapers.troniclk import TronicLkScraper, TronicSitemap
 
 
+# Validators and parsed results of Tronic.lk product pages from the previous crawl
+TRONIC_PAGE_CACHE_PATH = DATA_DIR / "tronic_pages.json"
+
+# Columns written for each scraped part, in the order of the row tuples built below;
+# the statement uses sqlite3's qmark placeholders
+_PART_INSERT_COLUMNS = (
+    "supplier_id",
+    "part_number",
+    "name",
+    "description",
+    "stock",
+    "price_tiers_json",
+    "datasheet_url",
+    "purchase_url",
+    "image_url",
+    "last_updated",
+)
+_PART_INSERT_SQL = "INSERT INTO {} ({}) VALUES ({})".format(
+    Part.__table__.name, ", ".join(_PART_INSERT_COLUMNS), ", ".join("?" * len(_PART_INSERT_COLUMNS))
+)
+
+# Scraped parts carry a single tier; only the price string needs escaping per row
+_EMPTY_TIER_JSON = json.dumps([{"qty": 1, "price": ""}])
+
+
+def _tier_json(price: Optional[str]) -> str:
+    if not price:
+        return _EMPTY_TIER_JSON
+    return '[{"qty": 1, "price": %s}]' % json.dumps(price)
+
+
+def _insert_parts(session: Session, rows: List[Tuple[Any, ...]]) -> None:
+    """Insert row tuples with one DBAPI executemany, skipping SQLAlchemy's per-row parameter processing."""
+    # last_updated is the one column with a Python-side default; stamp the batch once,
+    # formatted by the column type exactly as the ORM would store it
+    dialect = session.get_bind().dialect
+    process = Part.__table__.c.last_updated.type.dialect_impl(dialect).bind_processor(dialect)
+    stamp = process(datetime.utcnow()) if process else datetime.utcnow()
+    session.connection().exec_driver_sql(_PART_INSERT_SQL, [row + (stamp,) for row in rows])
+    session.commit()
+
+
 def _build_tronic_scraper(rule: Optional[SupplierRule]) -> TronicLkScraper:
     sitemap = None
     if rule and rule.sitemap_json:
@@ -29,7 +73,7 @@ def _build_tronic_scraper(rule: Optional[SupplierRule]) -> TronicLkScraper:
             )
         except Exception:
             sitemap = None
-    return TronicLkScraper(sitemap=sitemap, max_workers=16)
+    return TronicLkScraper(sitemap=sitemap, max_workers=16, page_cache=PageCache(TRONIC_PAGE_CACHE_PATH))
 
 
 def run_all_scrapers(session: Session, progress_key: str, batch_size: int = 250) -> None:
@@ -45,37 +89,36 @@ def run_all_scrapers(session: Session, progress_key: str, batch_size: int = 250)
 
         try:
             if s.name == "Tronic.lk":
-                scraper = _build_tronic_scraper(rule)
-                results = scraper.crawl_all()
-                scraped = 0
-                stored = 0
-                to_insert: List[Part] = []
-                total = max(len(results), 1)
-                for r in results:
-                    scraped += 1
-                    p = Part(
-                        supplier_id=s.id,
-                        part_number=r.found_part_number,
-                        name=r.name,
-                        description=r.description,
-                        stock=r.stock,
-                        price_tiers_json=json.dumps([{ "qty": 1, "price": r.price or "" }]),
-                        datasheet_url=r.datasheet_link,
-                        purchase_url=r.purchase_link,
-                        image_url=r.image_url,
-                    )
-                    to_insert.append(p)
-                    if len(to_insert) >= batch_size:
-                        session.bulk_save_objects(to_insert, return_defaults=False)
-                        session.commit()
+                with _build_tronic_scraper(rule) as scraper:
+                    product_links = scraper.collect_product_links()
+                    scraped = 0
+                    stored = 0
+                    to_insert: List[Tuple[Any, ...]] = []
+                    total = max(len(product_links), 1)
+                    # Results stream in while pages are still being fetched, so batches hit the DB
+                    # during the crawl; memory holds one batch plus the scraper's in-flight pages
+                    for r in scraper.iter_products(product_links):
+                        scraped += 1
+                        to_insert.append((
+                            s.id,
+                            r.found_part_number,
+                            r.name,
+                            r.description,
+                            r.stock,
+                            _tier_json(r.price),
+                            r.datasheet_link,
+                            r.purchase_link,
+                            r.image_url,
+                        ))
+                        if len(to_insert) >= batch_size:
+                            _insert_parts(session, to_insert)
+                            stored += len(to_insert)
+                            to_insert.clear()
+                            write_progress(key, {"pct": min(100.0, scraped*100.0/total), "scraped": scraped, "stored": stored, "status": "running"})
+                    if to_insert:
+                        _insert_parts(session, to_insert)
                         stored += len(to_insert)
-                        to_insert.clear()
-                        write_progress(key, {"pct": min(100.0, scraped*100.0/total), "scraped": scraped, "stored": stored, "status": "running"})
-                if to_insert:
-                    session.bulk_save_objects(to_insert, return_defaults=False)
-                    session.commit()
-                    stored += len(to_insert)
-                write_progress(key, {"pct": 100.0, "scraped": scraped, "stored": stored, "status": "done"})
+                    write_progress(key, {"pct": 100.0, "scraped": scraped, "stored": stored, "status": "done"})
             else:
                 write_progress(key, {"pct": 100.0, "scraped": 0, "stored": 0, "status": "skipped"})
         except Exception:
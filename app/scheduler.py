@@ -1,12 +1,27 @@
 from __future__ import annotations
 
 import json
+import os
+import tempfile
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Tuple
+from urllib.parse import quote
 
 META_PATH = Path("data/metadata.json")
-PROGRESS_PATH = Path("data/progress.json")
+PROGRESS_DIR = Path("data/progress")
+
+# Parsed progress per file, keyed on its stat signature so unchanged files are not re-read
+_progress_cache: Dict[Path, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+
+__all__ = [
+    "set_last_update_time",
+    "get_last_update_time",
+    "trigger_background_refresh",
+    "write_progress",
+    "read_progress",
+    "read_progress_many",
+]
 
 
 def set_last_update_time(dt: datetime) -> None:
@@ -30,23 +45,46 @@ def trigger_background_refresh() -> None:
     set_last_update_time(datetime.utcnow())
 
 
+def _progress_path(name: str) -> Path:
+    # One file per key; quoting keeps names like "scrape:Tronic.lk" filesystem-safe and distinct
+    return PROGRESS_DIR / f"{quote(name, safe='._-')}.json"
+
+
 def write_progress(name: str, data: Dict[str, Any]) -> None:
-    PROGRESS_PATH.parent.mkdir(parents=True, exist_ok=True)
-    all_data: Dict[str, Any] = {}
-    if PROGRESS_PATH.exists():
+    # Write only this key's file, atomically: readers see the old or new state, never a torn file
+    PROGRESS_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=PROGRESS_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            json.dump(data, fh)
+        os.replace(tmp_path, _progress_path(name))
+    except Exception:
         try:
-            all_data = json.loads(PROGRESS_PATH.read_text())
-        except Exception:
-            all_data = {}
-    all_data[name] = data
-    PROGRESS_PATH.write_text(json.dumps(all_data, indent=2))
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
 
 
 def read_progress(name: str) -> Dict[str, Any]:
-    if not PROGRESS_PATH.exists():
+    path = _progress_path(name)
+    try:
+        st = path.stat()
+    except OSError:
         return {}
+    # write_progress replaces the file, so a new inode or mtime means new content
+    signature = (st.st_mtime_ns, st.st_ino, st.st_size)
+    cached = _progress_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return dict(cached[1])
     try:
-        all_data = json.loads(PROGRESS_PATH.read_text())
-        return all_data.get(name, {})
+        data = json.loads(path.read_bytes())
     except Exception:
-        return {}
\ No newline at end of file
+        return {}
+    _progress_cache[path] = (signature, data)
+    return dict(data)
+
+
+def read_progress_many(names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    # One call for a whole progress grid; unchanged files come from the stat-keyed cache
+    return {name: read_progress(name) for name in names}
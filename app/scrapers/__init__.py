@@ -1,4 +1,4 @@
-from .base import SupplierScraper, SupplierResult
+from .base import SupplierScraper, SupplierResult, PageCache, search_all
 from .auto import AutoDetectScraper
 from .troniclk import TronicLkScraper
 from .lscs import LscsScraper
@@ -7,6 +7,8 @@ from .mouser import MouserScraper
 __all__ = [
     "SupplierScraper",
     "SupplierResult",
+    "PageCache",
+    "search_all",
     "AutoDetectScraper",
     "TronicLkScraper",
     "LscsScraper",
@@ -2,11 +2,9 @@ from __future__ import annotations
 
 import re
 from typing import List, Optional
+from urllib.parse import quote
 
-import requests
-from bs4 import BeautifulSoup
-
-from .base import SupplierScraper, SupplierResult
+from .base import SupplierScraper, SupplierResult, build_session, compile_css, get_capped, node_text, parse_html, select_one
 
 
 COMMON_CONTAINER_SELECTORS = [
@@ -44,10 +42,18 @@ COMMON_STOCK_SELECTORS = [
 ]
 
 
+# Translated once at import instead of re-parsing each selector for every container
+_CONTAINER_XPATHS = [compile_css(sel) for sel in COMMON_CONTAINER_SELECTORS]
+_NAME_XPATHS = [compile_css(sel) for sel in COMMON_NAME_SELECTORS]
+_PRICE_XPATHS = [compile_css(sel) for sel in COMMON_PRICE_SELECTORS]
+_STOCK_XPATHS = [compile_css(sel) for sel in COMMON_STOCK_SELECTORS]
+_PRICE_RE = re.compile(r"(\$|€|£|Rs|USD|LKR).*?\d")
+
+
 def text_or_none(node) -> Optional[str]:
-    if not node:
+    if node is None:
         return None
-    text = node.get_text(strip=True)
+    text = node_text(node, "")
     return text or None
 
 
@@ -59,40 +65,39 @@ class AutoDetectScraper(SupplierScraper):
             "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124 Safari/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
         }
+        self.session = build_session(self.headers)
 
     def _build_search_url(self, query: str) -> Optional[str]:
         if not self.search_url_template:
             return None
-        return self.search_url_template.replace("{query}", requests.utils.quote(query))
+        return self.search_url_template.replace("{query}", quote(query))
 
     def _detect_in_container(self, container) -> Optional[SupplierResult]:
         # Name
         name = None
         link = None
-        for sel in COMMON_NAME_SELECTORS:
-            el = container.select_one(sel)
-            if el and text_or_none(el):
-                name = text_or_none(el)
-                if el.name == "a" and el.has_attr("href"):
-                    link = el["href"]
+        for sel in _NAME_XPATHS:
+            el = select_one(container, sel)
+            name = text_or_none(el)
+            if name:
+                if el.tag == "a" and "href" in el.attrib:
+                    link = el.get("href")
                 break
 
         # Price
         price = None
-        for sel in COMMON_PRICE_SELECTORS:
-            el = container.select_one(sel)
-            if el and text_or_none(el):
-                text = text_or_none(el)
-                if text and re.search(r"(\$|€|£|Rs|USD|LKR).*?\d", text):
-                    price = text
-                    break
+        for sel in _PRICE_XPATHS:
+            text = text_or_none(select_one(container, sel))
+            if text and _PRICE_RE.search(text):
+                price = text
+                break
 
         # Stock
         stock = None
-        for sel in COMMON_STOCK_SELECTORS:
-            el = container.select_one(sel)
-            if el and text_or_none(el):
-                stock = text_or_none(el)
+        for sel in _STOCK_XPATHS:
+            text = text_or_none(select_one(container, sel))
+            if text:
+                stock = text
                 break
 
         if not (name or price or stock or link):
@@ -107,6 +112,7 @@ class AutoDetectScraper(SupplierScraper):
             stock=stock,
             datasheet_link=None,
             purchase_link=link,
+            image_url=None,
             extra={},
         )
 
@@ -115,12 +121,12 @@ class AutoDetectScraper(SupplierScraper):
         if not url:
             return []
         try:
-            resp = requests.get(url, headers=self.headers, timeout=20)
+            resp = get_capped(self.session, url, timeout=20)
             if resp.status_code != 200:
                 return []
-            soup = BeautifulSoup(resp.text, "lxml")
-            for cont_sel in COMMON_CONTAINER_SELECTORS:
-                containers = soup.select(cont_sel)
+            tree = parse_html(resp)
+            for cont_sel in _CONTAINER_XPATHS:
+                containers = cont_sel(tree)
                 results = []
                 for c in containers[: max_results * 2]:
                     r = self._detect_in_container(c)
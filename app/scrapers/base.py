@@ -1,10 +1,34 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import List, Mapping, Optional, Dict, Any, Iterator, Sequence
 
+import lxml.html
+import requests
+from cssselect import HTMLTranslator, parse as parse_css
+from cssselect.parser import Attrib, Class, Element, Hash, SelectorSyntaxError
+from lxml import etree
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-@dataclass
+# Supplier pages are a few hundred KiB; anything past this is a runaway page and is cut off
+MAX_BODY_BYTES = 2 * 1024 * 1024
+
+_css_translator = HTMLTranslator()
+# Same strings BeautifulSoup's get_text() used to yield: text nodes outside <script>/<style>
+_text_nodes = etree.XPath("descendant::text()[not(parent::script) and not(parent::style)]")
+
+
+# One instance per scraped product; slots drop the per-instance __dict__
+@dataclass(slots=True)
 class SupplierResult:
     supplier: str
     found_part_number: Optional[str]
@@ -26,4 +50,206 @@ class SupplierScraper:
 
     def fetch_by_part_number(self, part_number: str) -> List[SupplierResult]:
         # Default behavior: perform a search with the part number
-        return self.search(part_number, max_results=10)
\ No newline at end of file
+        return self.search(part_number, max_results=10)
+
+    def close(self) -> None:
+        # Release the pooled keep-alive connections held by the scraper's session
+        session = getattr(self, "session", None)
+        if session is not None:
+            session.close()
+
+    def __enter__(self) -> "SupplierScraper":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def search_all(scrapers: Sequence[SupplierScraper], query: str, max_results: int = 20) -> List[SupplierResult]:
+    """Run one query against every scraper concurrently; results keep the scrapers' order.
+
+    Each search is network-bound, so the lookup takes about as long as the slowest supplier
+    instead of the sum of all of them. A failing scraper contributes no results.
+    """
+    def run(scraper: SupplierScraper) -> List[SupplierResult]:
+        try:
+            return scraper.search(query, max_results=max_results)
+        except Exception:
+            return []
+
+    if not scrapers:
+        return []
+    with ThreadPoolExecutor(max_workers=len(scrapers)) as ex:
+        per_scraper = list(ex.map(run, scrapers))
+    return [r for results in per_scraper for r in results]
+
+
+class PageCache:
+    """Validators (ETag/Last-Modified) and the parsed result per page URL, persisted as JSON.
+
+    Lets a re-crawl send conditional GETs and reuse the previous result on 304 Not Modified,
+    skipping both the body transfer and the parse. Safe to share between worker threads.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            self._entries = json.loads(self.path.read_bytes())
+        except Exception:
+            self._entries = {}
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        entry = self._entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def result(self, url: str) -> Optional[SupplierResult]:
+        entry = self._entries.get(url)
+        if not entry:
+            return None
+        try:
+            return SupplierResult(**entry["result"])
+        except Exception:
+            return None
+
+    def store(self, url: str, resp: CappedResponse, result: SupplierResult) -> None:
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        with self._lock:
+            if not (etag or last_modified):
+                # Nothing to revalidate against next time
+                self._entries.pop(url, None)
+                return
+            self._entries[url] = {"etag": etag, "last_modified": last_modified, "result": asdict(result)}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            payload = json.dumps(self._entries)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                fh.write(payload)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+def build_session(headers: Dict[str, str], pool_size: int = 10) -> requests.Session:
+    """Keep-alive session with a connection pool of pool_size and a small retry policy."""
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@dataclass(slots=True)
+class CappedResponse:
+    """What scrapers read from a GET: status, headers and at most max_bytes of the decoded body."""
+
+    url: str
+    status_code: int
+    headers: Mapping[str, str]
+    # Charset requests derived from Content-Type (ISO-8859-1 for a bare text/*), as Response.encoding
+    encoding: Optional[str]
+    content: bytes
+
+
+def get_capped(session: requests.Session, url: str, max_bytes: int = MAX_BODY_BYTES, **kwargs) -> CappedResponse:
+    """GET url reading at most max_bytes of the (decompressed) body; the connection is released on return."""
+    resp = session.get(url, stream=True, **kwargs)
+    try:
+        body = resp.raw.read(max_bytes, decode_content=True)
+    finally:
+        resp.close()
+    return CappedResponse(
+        url=resp.url,
+        status_code=resp.status_code,
+        headers=resp.headers,
+        encoding=resp.encoding,
+        content=body,
+    )
+
+
+def declared_encoding(resp: CappedResponse) -> Optional[str]:
+    """Charset from the Content-Type header, or None to let the parser sniff the document."""
+    content_type = resp.headers.get("Content-Type", "").lower()
+    return resp.encoding if "charset" in content_type else None
+
+
+def parse_html(resp: CappedResponse) -> lxml.html.HtmlElement:
+    """Parse a response body from bytes; an explicit HTTP charset wins, otherwise lxml sniffs <meta>."""
+    encoding = declared_encoding(resp)
+    parser = lxml.html.HTMLParser(encoding=encoding) if encoding else None
+    return lxml.html.document_fromstring(resp.content, parser=parser)
+
+
+# Scrapers are rebuilt per run with the same sitemap selectors; translate each string once
+@lru_cache(maxsize=128)
+def compile_css(css: str) -> etree.XPath:
+    """Pre-translate a CSS selector into an XPath over descendants, like BeautifulSoup's select()."""
+    return etree.XPath(_css_translator.css_to_xpath(css, prefix="descendant::"))
+
+
+def _is_simple_selector(tree) -> bool:
+    while isinstance(tree, (Attrib, Class, Hash)):
+        tree = tree.selector
+    return isinstance(tree, Element)
+
+
+@lru_cache(maxsize=128)
+def compile_css_matcher(css: str) -> Optional[etree.XPath]:
+    """Pre-translate a CSS selector into an XPath that tests a single element.
+
+    Returns None when the selector needs ancestors or siblings (combinators, pseudo-classes),
+    which are gone by the time stream_attr sees an element.
+    """
+    try:
+        selectors = parse_css(css)
+    except SelectorSyntaxError:
+        return None
+    if any(s.pseudo_element or not _is_simple_selector(s.parsed_tree) for s in selectors):
+        return None
+    return etree.XPath(_css_translator.css_to_xpath(css, prefix="self::"))
+
+
+def stream_attr(resp: CappedResponse, matcher: etree.XPath, attr: str) -> Iterator[Optional[str]]:
+    """Yield attr of every element matched by matcher, streaming the body through iterparse.
+
+    Each element is cleared and unlinked once seen, so the document tree never builds up in memory.
+    """
+    events = etree.iterparse(BytesIO(resp.content), events=("end",), html=True, encoding=declared_encoding(resp))
+    for _, el in events:
+        if matcher(el):
+            yield el.get(attr)
+        el.clear(keep_tail=True)
+        while el.getprevious() is not None:
+            del el.getparent()[0]
+
+
+def select_one(node, selector: etree.XPath):
+    matches = selector(node)
+    return matches[0] if matches else None
+
+
+def node_text(node, separator: str = " ") -> str:
+    """Equivalent of BeautifulSoup's get_text(separator, strip=True)."""
+    return separator.join(t.strip() for t in _text_nodes(node) if t.strip())
\ No newline at end of file
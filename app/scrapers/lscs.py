@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from urllib.parse import urljoin
-import requests
-from bs4 import BeautifulSoup
+from urllib.parse import quote, urljoin
 
-from .base import SupplierScraper, SupplierResult
+from .base import SupplierScraper, SupplierResult, build_session, compile_css, get_capped, node_text, parse_html, select_one
+
+_ITEMS = compile_css("div.product-item, div.product, li.product")
+_NAME = compile_css("a, h3, h2")
+_PRICE = compile_css(".price, span.price, .product-price")
+_IMAGE = compile_css("img")
 
 
 class LscsScraper(SupplierScraper):
@@ -15,10 +18,10 @@ class LscsScraper(SupplierScraper):
             "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124 Safari/537.36",
             "Accept-Language": "en-US,en;q=0.9",
         }
+        self.session = build_session(self.headers)
         self.base_url = "https://www.lcsc.com/"
 
     def _build_search_url(self, query: str) -> str:
-        from requests.utils import quote
         return f"https://www.lcsc.com/search?q={quote(query)}"
 
     def _abs(self, href: str | None) -> str | None:
@@ -29,20 +32,20 @@ class LscsScraper(SupplierScraper):
     def search(self, query: str, max_results: int = 20):
         url = self._build_search_url(query)
         try:
-            resp = requests.get(url, headers=self.headers, timeout=20)
+            resp = get_capped(self.session, url, timeout=20)
             if resp.status_code != 200:
                 return []
-            soup = BeautifulSoup(resp.text, "lxml")
-            items = soup.select("div.product-item, div.product, li.product")
+            tree = parse_html(resp)
+            items = _ITEMS(tree)
             results = []
             for item in items[:max_results]:
-                name_el = item.select_one("a, h3, h2")
-                name = name_el.get_text(strip=True) if name_el else None
-                link = self._abs(name_el["href"]) if name_el and name_el.has_attr("href") else None
-                price_el = item.select_one(".price, span.price, .product-price")
-                price = price_el.get_text(strip=True) if price_el else None
-                img_el = item.select_one("img")
-                img_url = self._abs(img_el.get("data-src") or img_el.get("src")) if img_el else None
+                name_el = select_one(item, _NAME)
+                name = node_text(name_el, "") if name_el is not None else None
+                link = self._abs(name_el.get("href")) if name_el is not None and "href" in name_el.attrib else None
+                price_el = select_one(item, _PRICE)
+                price = node_text(price_el, "") if price_el is not None else None
+                img_el = select_one(item, _IMAGE)
+                img_url = self._abs(img_el.get("data-src") or img_el.get("src")) if img_el is not None else None
 
                 results.append(
                     SupplierResult(
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
-from urllib.parse import urljoin
-import requests
-from bs4 import BeautifulSoup
+from urllib.parse import quote, urljoin
 
-from .base import SupplierScraper, SupplierResult
+from .base import SupplierScraper, SupplierResult, build_session, compile_css, get_capped, node_text, parse_html, select_one
+
+_ITEMS = compile_css(".search-results-products tr, .SearchResultsRow, .row")
+_NAME = compile_css("a")
+_PRICE = compile_css(".price, .Price, .price-breaks")
+_STOCK = compile_css(".availability, .Availability")
+_IMAGE = compile_css("img")
 
 
 class MouserScraper(SupplierScraper):
@@ -15,10 +19,10 @@ class MouserScraper(SupplierScraper):
             "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124 Safari/537.36",
             "Accept-Language": "en-US,en;q=0.9",
         }
+        self.session = build_session(self.headers)
         self.base_url = "https://www.mouser.com/"
 
     def _build_search_url(self, query: str) -> str:
-        from requests.utils import quote
         return f"https://www.mouser.com/c/?q={quote(query)}"
 
     def _abs(self, href: str | None) -> str | None:
@@ -29,24 +33,24 @@ class MouserScraper(SupplierScraper):
     def search(self, query: str, max_results: int = 20):
         url = self._build_search_url(query)
         try:
-            resp = requests.get(url, headers=self.headers, timeout=20)
+            resp = get_capped(self.session, url, timeout=20)
             if resp.status_code != 200:
                 return []
-            soup = BeautifulSoup(resp.text, "lxml")
-            items = soup.select(".search-results-products tr, .SearchResultsRow, .row")
+            tree = parse_html(resp)
+            items = _ITEMS(tree)
             results = []
             for item in items[:max_results]:
-                name_el = item.select_one("a")
-                if not name_el:
+                name_el = select_one(item, _NAME)
+                if name_el is None:
                     continue
-                name = name_el.get_text(strip=True)
+                name = node_text(name_el, "")
                 link = self._abs(name_el.get("href"))
-                price_el = item.select_one(".price, .Price, .price-breaks")
-                price = price_el.get_text(strip=True) if price_el else None
-                stock_el = item.select_one(".availability, .Availability")
-                stock = stock_el.get_text(strip=True) if stock_el else None
-                img_el = item.select_one("img")
-                img_url = self._abs(img_el.get("data-src") or img_el.get("src")) if img_el else None
+                price_el = select_one(item, _PRICE)
+                price = node_text(price_el, "") if price_el is not None else None
+                stock_el = select_one(item, _STOCK)
+                stock = node_text(stock_el, "") if stock_el is not None else None
+                img_el = select_one(item, _IMAGE)
+                img_url = self._abs(img_el.get("data-src") or img_el.get("src")) if img_el is not None else None
                 results.append(
                     SupplierResult(
                         supplier=self.supplier_name,
@@ -1,18 +1,76 @@
 from __future__ import annotations
 
+import html
+import re
+import threading
 from dataclasses import dataclass
-from typing import List, Optional, Iterable, Set
-from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
+from functools import lru_cache
+from typing import Dict, List, Optional, Iterable, Iterator, Set
+from urllib.parse import quote, urljoin, urlparse, urlunparse, parse_qsl, urlencode
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 
-import requests
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 
-from .base import SupplierScraper, SupplierResult
+from .base import (
+    CappedResponse,
+    PageCache,
+    SupplierScraper,
+    SupplierResult,
+    build_session,
+    compile_css,
+    compile_css_matcher,
+    get_capped,
+    node_text,
+    parse_html,
+    select_one,
+    stream_attr,
+)
 
+_ROWS = etree.XPath("descendant::tr")
+_ROW_CELLS = etree.XPath("descendant::td | descendant::th")
+_FALLBACK_IMAGE = compile_css(".images img, .woocommerce-product-gallery__image img, img")
+# Minimum spacing between successive search-result page requests
+_PAGE_INTERVAL = 0.1
+# Query params that never select a different product: click tracking and listing sort/view state
+_IGNORED_PARAMS = {"gclid", "fbclid", "orderby", "sort", "view", "per_page"}
+# Assets linked from product listings that are not product pages
+_SKIP_EXT_RE = re.compile(r"\.(?:jpe?g|png|gif|webp|svg|pdf|docx?|xlsx?|zip|mp3|mp4)(?:[?#]|$)", re.IGNORECASE)
+_DEFAULT_PORTS = {"http": ":80", "https": ":443"}
+# <link rel="canonical"> in the page head; mirrored product URLs all point at the same one
+_CANONICAL_TAG_RE = re.compile(rb"<link\b[^>]*\brel\s*=\s*[\"']?canonical\b[^>]*>", re.IGNORECASE)
+_HREF_ATTR_RE = re.compile(rb"\bhref\s*=\s*(?:\"([^\"]*)\"|'([^']*)')", re.IGNORECASE)
 
-@dataclass
+
+# Path/query/fragment made only of characters urljoin passes through untouched; an empty
+# query or fragment ("?#", trailing "?" or "#") is dropped by urljoin, so it is excluded
+_PLAIN_URL_TAIL = r"[A-Za-z0-9\-._~%!$&'()*+,=:@/?#]*(?<![?#])\Z"
+_PLAIN_ABSOLUTE_RE = re.compile(r"https?://[A-Za-z0-9\-.]+(?::\d+)?(?:[/?#]" + _PLAIN_URL_TAIL + r"|\Z)")
+_PLAIN_ROOT_PATH_RE = re.compile(r"/(?!/)" + _PLAIN_URL_TAIL)
+
+
+@lru_cache(maxsize=8)
+def _origin(base_url: str) -> str:
+    parsed = urlparse(base_url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def _canonicalize(url: str) -> str:
+    """Collapse URLs that name the same page: lowercase host, no default port, fragment or ignored params."""
+    parsed = urlparse(url)
+    netloc = parsed.netloc.lower()
+    default_port = _DEFAULT_PORTS.get(parsed.scheme)
+    if default_port and netloc.endswith(default_port):
+        netloc = netloc[: -len(default_port)]
+    query = [
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not (k.startswith("utm_") or k in _IGNORED_PARAMS)
+    ]
+    return urlunparse((parsed.scheme, netloc, parsed.path, parsed.params, urlencode(sorted(query)), ""))
+
+
+@dataclass(slots=True)
 class TronicSitemap:
     category_selector: str
     pagination_selector: str
@@ -27,13 +85,19 @@ class TronicSitemap:
 class TronicLkScraper(SupplierScraper):
     supplier_name = "Tronic.lk"
 
-    def __init__(self, sitemap: Optional[TronicSitemap] = None, max_workers: int = 8):
+    def __init__(self, sitemap: Optional[TronicSitemap] = None, max_workers: int = 8, page_cache: Optional[PageCache] = None):
         self.headers = {
             "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124 Safari/537.36",
             "Accept-Language": "en-US,en;q=0.9",
         }
         self.base_url = "https://tronic.lk/"
         self.max_workers = max_workers
+        # Optional: revalidate product pages with conditional GETs on re-crawls
+        self.page_cache = page_cache
+        self._seen_lock = threading.Lock()
+        # One pooled session shared by the worker threads: keep-alive instead of a new
+        # TCP+TLS handshake per page, with a pool large enough for every worker
+        self.session = build_session(self.headers, pool_size=max_workers)
         if sitemap is None:
             self.sitemap = TronicSitemap(
                 category_selector="#navbar-ex1-collapse a[href*='/category/'], #navbar-ex1-collapse a[href*='/product-category/']",
@@ -47,54 +111,141 @@ class TronicLkScraper(SupplierScraper):
             )
         else:
             self.sitemap = sitemap
+        # Translate the sitemap's CSS to XPath once instead of on every page
+        self._category_xpath = compile_css(self.sitemap.category_selector)
+        self._pagination_xpath = compile_css(self.sitemap.pagination_selector)
+        self._product_link_xpath = compile_css(self.sitemap.product_link_selector)
+        self._description_xpath = compile_css(self.sitemap.description_selector)
+        self._image_xpath = compile_css(self.sitemap.image_selector)
+        # Listing pages only need product hrefs, so they are streamed when the selector allows it
+        self._product_link_matcher = compile_css_matcher(self.sitemap.product_link_selector)
 
-    def _get(self, url: str) -> Optional[BeautifulSoup]:
+    def _fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[CappedResponse]:
         try:
-            r = requests.get(url, headers=self.headers, timeout=25, allow_redirects=True)
+            r = get_capped(self.session, url, timeout=25, allow_redirects=True, headers=headers)
             if r.status_code >= 400:
                 return None
-            return BeautifulSoup(r.text, "lxml")
+            return r
+        except Exception:
+            return None
+
+    def _get_tree(self, url: str) -> Optional[lxml.html.HtmlElement]:
+        r = self._fetch(url)
+        if r is None:
+            return None
+        try:
+            return parse_html(r)
         except Exception:
             return None
 
     def _abs(self, href: str | None) -> str | None:
         if not href:
             return None
+        # Common cases without re-parsing the base URL: already absolute, or a plain
+        # root-relative path. Anything urljoin would rewrite (dot segments, whitespace,
+        # ';' params, protocol-relative) takes the slow path.
+        if "/." not in href and "?#" not in href:
+            if _PLAIN_ABSOLUTE_RE.match(href):
+                return href
+            if _PLAIN_ROOT_PATH_RE.match(href):
+                return _origin(self.base_url) + href
         return urljoin(self.base_url, href)
 
     def _is_valid_product_link(self, url: Optional[str]) -> bool:
-        return bool(url and "/product/" in url)
+        return bool(url and "/product/" in url and not _SKIP_EXT_RE.search(url))
+
+    def _product_link(self, href: Optional[str]) -> Optional[str]:
+        # Canonical form, so the same product linked with a fragment or tracking params is fetched once
+        url = self._abs(href)
+        return _canonicalize(url) if self._is_valid_product_link(url) else None
 
-    def _extract_label_value(self, soup: BeautifulSoup, label: str) -> Optional[str]:
-        for tr in soup.select("tr"):
-            cells = tr.find_all(["td", "th"]) or []
-            if not cells:
+    def _extract_label_values(self, tree: lxml.html.HtmlElement, labels: List[str]) -> Dict[str, Optional[str]]:
+        """Single scan over the table rows; each label takes the value of the first row whose text contains it."""
+        values: Dict[str, Optional[str]] = {label: None for label in labels}
+        missing = {label: label.lower() for label in labels}
+        for tr in _ROWS(tree):
+            cells = _ROW_CELLS(tr)
+            if len(cells) < 2:
                 continue
-            row_text = " ".join(c.get_text(" ", strip=True) for c in cells).lower()
-            if label.lower() in row_text and len(cells) >= 2:
-                tds = tr.find_all("td")
-                if len(tds) >= 2:
-                    val = tds[1].get_text(" ", strip=True)
-                    if val:
-                        return val
-                val = cells[1].get_text(" ", strip=True)
-                if val:
-                    return val
-        return None
+            row_text = " ".join(node_text(c) for c in cells).lower()
+            pending = [label for label, needle in missing.items() if needle in row_text]
+            if not pending:
+                continue
+            # The <td> cells are a subset of cells already in document order; no second walk
+            tds = [c for c in cells if c.tag == "td"]
+            val = node_text(tds[1]) if len(tds) >= 2 else ""
+            if not val:
+                val = node_text(cells[1])
+            if val:
+                for label in pending:
+                    values[label] = val
+                    del missing[label]
+                if not missing:
+                    break
+        return values
+
+    def _canonical_link(self, content: bytes) -> Optional[str]:
+        """Canonical URL declared in the page head, found without parsing the document."""
+        head_end = content.find(b"</head")
+        tag = _CANONICAL_TAG_RE.search(content, 0, head_end if head_end >= 0 else len(content))
+        href = _HREF_ATTR_RE.search(tag.group(0)) if tag else None
+        if not href:
+            return None
+        url = self._abs(html.unescape((href.group(1) or href.group(2)).decode("utf-8", "replace")).strip())
+        return _canonicalize(url) if url else None
+
+    def _first_sighting(self, seen_products: Optional[Set[tuple]], key: tuple) -> bool:
+        if seen_products is None:
+            return True
+        with self._seen_lock:
+            if key in seen_products:
+                return False
+            seen_products.add(key)
+            return True
 
-    def _parse_product_page(self, url: str) -> Optional[SupplierResult]:
-        soup = self._get(url)
-        if not soup:
+    @staticmethod
+    def _product_key(result: SupplierResult) -> tuple:
+        return ("fields", result.name, result.found_part_number, result.price, result.description, result.image_url)
+
+    def _parse_product_page(self, url: str, seen_products: Optional[Set[tuple]] = None) -> Optional[SupplierResult]:
+        # WooCommerce serves the same product under several URLs; only the first one is kept.
+        # Raw bodies differ in nonces and timestamps, so mirrors are recognised by the canonical
+        # link before parsing, and by the extracted fields for pages (or cache hits) without one
+        cache = self.page_cache
+        r = self._fetch(url, headers=cache.conditional_headers(url) if cache else None)
+        if r is None:
+            return None
+        if r.status_code == 304 and cache:
+            result = cache.result(url)
+            if result and not self._first_sighting(seen_products, self._product_key(result)):
+                return None
+            return result
+        if seen_products is not None:
+            canonical = self._canonical_link(r.content)
+            if canonical and not self._first_sighting(seen_products, ("canonical", canonical)):
+                return None
+        try:
+            tree = parse_html(r)
+        except Exception:
             return None
-        name = self._extract_label_value(soup, "Name")
-        code = self._extract_label_value(soup, "Code")
-        price = self._extract_label_value(soup, "Price")
+        result = self._result_from_tree(url, tree)
+        if result and not self._first_sighting(seen_products, self._product_key(result)):
+            return None
+        if result and cache:
+            cache.store(url, r, result)
+        return result
+
+    def _result_from_tree(self, url: str, tree: lxml.html.HtmlElement) -> Optional[SupplierResult]:
+        labels = self._extract_label_values(tree, ["Name", "Code", "Price"])
+        name, code, price = labels["Name"], labels["Code"], labels["Price"]
         if not (name or price):
             return None
-        desc_nodes = soup.select(self.sitemap.description_selector)
-        description = " \n".join([n.get_text(" ", strip=True) for n in desc_nodes]) if desc_nodes else None
-        img_el = soup.select_one(self.sitemap.image_selector) or soup.select_one(".images img, .woocommerce-product-gallery__image img, img")
-        img_url = self._abs(img_el.get("src") if img_el else None)
+        desc_nodes = self._description_xpath(tree)
+        description = " \n".join([node_text(n) for n in desc_nodes]) if desc_nodes else None
+        img_el = select_one(tree, self._image_xpath)
+        if img_el is None:
+            img_el = select_one(tree, _FALLBACK_IMAGE)
+        img_url = self._abs(img_el.get("src") if img_el is not None else None)
         return SupplierResult(
             supplier=self.supplier_name,
             found_part_number=code,
@@ -120,29 +271,39 @@ class TronicLkScraper(SupplierScraper):
         new_query = urlencode(qs)
         return urlunparse((parsed.scheme, parsed.netloc, parsed.path, parsed.params, new_query, parsed.fragment))
 
-    def _collect_all_page_urls(self, soup: BeautifulSoup, first_url: str) -> List[str]:
+    def _product_links(self, tree: lxml.html.HtmlElement) -> List[str]:
+        links = [self._product_link(a.get("href")) for a in self._product_link_xpath(tree)]
+        return [l for l in links if l]
+
+    def _collect_all_page_urls(self, tree: lxml.html.HtmlElement, first_url: str) -> List[str]:
         # Find numeric pagination links and compute max page
         pages = set()
-        for a in soup.select(self.sitemap.pagination_selector):
-            txt = (a.get_text(" ", strip=True) or "").strip()
+        for a in self._pagination_xpath(tree):
+            txt = node_text(a)
             if txt.isdigit():
                 pages.add(int(txt))
         max_page = max(pages) if pages else 1
         return [self._normalize_page_url(first_url, p) for p in range(1, max_page + 1)]
 
     def _collect_product_links_from_page(self, url: str) -> List[str]:
-        soup = self._get(url)
-        if not soup:
+        if self._product_link_matcher is None:
+            tree = self._get_tree(url)
+            return self._product_links(tree) if tree is not None else []
+        r = self._fetch(url)
+        if r is None:
             return []
-        links = [self._abs(a.get("href")) for a in soup.select(self.sitemap.product_link_selector)]
-        return [l for l in links if self._is_valid_product_link(l)]
+        try:
+            links = [self._product_link(href) for href in stream_attr(r, self._product_link_matcher, "href")]
+        except Exception:
+            return []
+        return [l for l in links if l]
 
     def _get_all_category_links(self) -> List[str]:
         # Try to get categories from navigation menu
-        soup = self._get(self.base_url)
-        if not soup:
+        tree = self._get_tree(self.base_url)
+        if tree is None:
             return []
-        cats = [self._abs(a.get("href")) for a in soup.select(self.sitemap.category_selector)]
+        cats = [self._abs(a.get("href")) for a in self._category_xpath(tree)]
         # Deduplicate and keep only category-like paths
         out = []
         seen = set()
@@ -155,41 +316,68 @@ class TronicLkScraper(SupplierScraper):
                     out.append(c)
         return out
 
-    def crawl_all(self) -> List[SupplierResult]:
-        # Strategy: crawl all category pages and all their pagination, deduplicate product links, then fetch concurrently
+    def collect_product_links(self) -> Set[str]:
+        # Strategy: crawl all category pages and all their pagination, deduplicating product links
         category_links = self._get_all_category_links()
         # Fallback to a products listing page if categories not found
         if not category_links:
             candidate = self._find_listing_start()
             if candidate:
                 category_links = [candidate]
-        if not category_links:
-            return []
 
         product_links: Set[str] = set()
-        for cat in category_links:
-            soup = self._get(cat)
-            if not soup:
-                continue
-            page_urls = self._collect_all_page_urls(soup, cat)
-            for pu in page_urls:
-                for l in self._collect_product_links_from_page(pu):
-                    product_links.add(l)
+        # Listing pages are independent once pagination is known: fetch them on the pool too
+        with ThreadPoolExecutor(max_workers=self.max_workers) as ex:
+            page_urls: List[str] = []
+            for cat, tree in zip(category_links, ex.map(self._get_tree, category_links)):
+                if tree is None:
+                    continue
+                page_urls.extend(self._collect_all_page_urls(tree, cat))
+            for links in ex.map(self._collect_product_links_from_page, page_urls):
+                product_links.update(links)
+        return product_links
 
-        results: List[SupplierResult] = []
-        if not product_links:
-            return results
+    def iter_products(self, product_links: Iterable[str]) -> Iterator[SupplierResult]:
+        """Fetch product pages concurrently, yielding each result as soon as it is parsed.
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as ex:
-            futures = {ex.submit(self._parse_product_page, url): url for url in product_links}
-            for f in as_completed(futures):
-                try:
-                    r = f.result()
+        At most twice max_workers pages are in flight, and a finished future is dropped once its
+        result is yielded, so memory follows the window rather than the catalog size.
+        """
+        seen_products: Set[tuple] = set()
+        links = iter(product_links)
+        window = max(1, self.max_workers * 2)
+        ex = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            pending: Set[Future] = set()
+            while True:
+                for url in links:
+                    pending.add(ex.submit(self._parse_product_page, url, seen_products))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    try:
+                        r = f.result()
+                    except Exception:
+                        continue
                     if r:
-                        results.append(r)
+                        yield r
+        finally:
+            # A consumer that stops early should not wait on pages nobody will read
+            ex.shutdown(wait=True, cancel_futures=True)
+            if self.page_cache:
+                try:
+                    self.page_cache.save()
                 except Exception:
-                    continue
-        return results
+                    pass
+
+    def iter_all(self) -> Iterator[SupplierResult]:
+        return self.iter_products(self.collect_product_links())
+
+    def crawl_all(self) -> List[SupplierResult]:
+        return list(self.iter_all())
 
     def _find_listing_start(self) -> Optional[str]:
         candidates = [
@@ -198,37 +386,42 @@ class TronicLkScraper(SupplierScraper):
             "https://tronic.lk/?post_type=product&s=",
         ]
         for u in candidates:
-            soup = self._get(u)
-            if not soup:
+            tree = self._get_tree(u)
+            if tree is None:
                 continue
-            links = [self._abs(a.get("href")) for a in soup.select(self.sitemap.product_link_selector)]
-            links = [l for l in links if self._is_valid_product_link(l)]
-            if links:
+            if self._product_links(tree):
                 return u
         return None
 
-    def _iter_pages(self, start_url: str) -> Iterable[BeautifulSoup]:
-        soup = self._get(start_url)
-        if not soup:
+    def _iter_pages(self, start_url: str) -> Iterable[lxml.html.HtmlElement]:
+        next_request_at = time.monotonic() + _PAGE_INTERVAL
+        tree = self._get_tree(start_url)
+        if tree is None:
             return
-        yield soup
+        yield tree
         # Iterate over computed numeric pages if available
-        page_urls = self._collect_all_page_urls(soup, start_url)
+        page_urls = self._collect_all_page_urls(tree, start_url)
         for pu in page_urls[1:]:
-            s2 = self._get(pu)
-            if not s2:
+            # Space requests out without adding a fixed stall: time already spent fetching
+            # and consuming the previous page counts toward the interval. Retry-After on
+            # 429/503 is honoured by the session's retry policy.
+            delay = next_request_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_request_at = time.monotonic() + _PAGE_INTERVAL
+            t2 = self._get_tree(pu)
+            if t2 is None:
                 continue
-            yield s2
-            time.sleep(0.1)
+            yield t2
 
     def search(self, query: str, max_results: int = 200) -> List[SupplierResult]:
-        search_url = f"https://tronic.lk/?s={requests.utils.quote(query)}&post_type=product"
+        search_url = f"https://tronic.lk/?s={quote(query)}&post_type=product"
         results: List[SupplierResult] = []
         product_links: Set[str] = set()
-        for soup in self._iter_pages(search_url):
-            for a in soup.select(self.sitemap.product_link_selector):
-                href = self._abs(a.get("href"))
-                if self._is_valid_product_link(href):
+        for tree in self._iter_pages(search_url):
+            for a in self._product_link_xpath(tree):
+                href = self._product_link(a.get("href"))
+                if href:
                     product_links.add(href)
                 if len(product_links) >= max_results:
                     break
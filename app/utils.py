@@ -1,17 +1,36 @@
 from __future__ import annotations
 
+import codecs
 import io
 import json
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterable, Tuple, List, Dict, Optional
 
+import numpy as np
 import pandas as pd
+from openpyxl import Workbook
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from .db import get_session
 from .models import Supplier, Part
 
+# Part column <- sample CSV column
+SAMPLE_PART_COLUMNS = {
+    "part_number": "Part_Number",
+    "name": "Name",
+    "description": "Description",
+    "package": "Package",
+    "voltage": "Voltage",
+    "other_specs": "Other_Specs",
+    "stock": "Stock",
+    "datasheet_url": "Datasheet",
+    "purchase_url": "Purchase_Link",
+    "image_url": "Image",
+}
+
 REQUIRED_COLUMNS = [
     "Part_Name",
     "Description",
@@ -22,61 +41,112 @@ REQUIRED_COLUMNS = [
 ]
 
 
+_DECODE_SNIFF_CHUNK = 1 << 20
+
+
+def _decodes_as(raw: bytes, enc: str) -> bool:
+    """True if raw decodes cleanly as enc; checked in chunks so no full-size str is kept."""
+    decoder = codecs.getincrementaldecoder(enc)(errors="strict")
+    view = memoryview(raw)
+    try:
+        for start in range(0, len(raw), _DECODE_SNIFF_CHUNK):
+            decoder.decode(view[start:start + _DECODE_SNIFF_CHUNK])
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+# Integral floats at or past this magnitude are int columns pyarrow overflowed (the C parser gives uint64)
+_INT64_LIMIT = float(2 ** 63)
+
+
+def _overflowed_int_column(col: pd.Series) -> bool:
+    if col.dtype.kind != "f":
+        return False
+    values = col.to_numpy()
+    values = values[~np.isnan(values)]
+    return bool(len(values)) and bool(np.all(values == np.floor(values))) and bool(np.abs(values).max() >= _INT64_LIMIT)
+
+
+def _read_csv_bytes(raw: bytes, encoding: str) -> pd.DataFrame:
+    # The multithreaded pyarrow parser is several times faster on large files. It rejects ragged
+    # rows (or is not installed), keeps blank and duplicate headers unnamed/unmangled, parses
+    # date/time text, turns integers past int64 into float and types header-only columns
+    # differently; in those cases the C parser's frame is returned
+    try:
+        df = pd.read_csv(io.BytesIO(raw), encoding=encoding, engine="pyarrow")
+        if (
+            len(df)
+            and all(df[c].dtype.kind in "biuf" or pd.api.types.is_string_dtype(df[c]) for c in df.columns)
+            and not any(_overflowed_int_column(df[c]) for c in df.columns)
+            # Header names exactly as the C parser gives them ("Unnamed: N", "x.1", ...)
+            and list(df.columns) == list(pd.read_csv(io.BytesIO(raw), encoding=encoding, nrows=0).columns)
+        ):
+            return df
+    except Exception:
+        pass
+    return pd.read_csv(io.BytesIO(raw), encoding=encoding, encoding_errors="strict")
+
+
 def read_bom_file(uploaded) -> pd.DataFrame:
     filename = uploaded.name.lower()
     if filename.endswith(".csv"):
-        # Read raw bytes and try multiple encodings
+        # Read raw bytes and try multiple encodings; the C parser decodes the bytes itself,
+        # so no intermediate str copy of the whole file is made per attempt
         raw: bytes = uploaded.read()
         encodings_to_try = ["utf-8", "utf-8-sig", "cp1252", "latin1"]
         last_err = None
         for enc in encodings_to_try:
+            # A plain decode pass is far cheaper than a parse that dies on a bad byte
+            if not _decodes_as(raw, enc):
+                continue
             try:
-                text = raw.decode(enc, errors="strict")
-                return pd.read_csv(io.StringIO(text))
+                return _read_csv_bytes(raw, enc)
             except Exception as exc:
                 last_err = exc
                 continue
         # Fallback: replace undecodable bytes to avoid hard failure
-        text = raw.decode("utf-8", errors="replace")
-        return pd.read_csv(io.StringIO(text))
+        return pd.read_csv(io.BytesIO(raw), encoding="utf-8", encoding_errors="replace")
     else:
         # Excel handler
         return pd.read_excel(uploaded)
 
 
-def normalize_bom_columns(df: pd.DataFrame) -> pd.DataFrame:
-    def norm(s: str) -> str:
-        return "".join(ch for ch in s.lower() if ch.isalnum())
-
-    alias_map: Dict[str, str] = {
-        # Part name
-        "partname": "Part_Name",
-        "name": "Part_Name",
-        "item": "Part_Name",
-        "component": "Part_Name",
-        # Description
-        "description": "Description",
-        "desc": "Description",
-        # Quantity
-        "qty": "Quantity",
-        "quantity": "Quantity",
-        # Package / footprint
-        "package": "Package",
-        "footprint": "Package",
-        # Voltage
-        "voltage": "Voltage",
-        "volt": "Voltage",
-        # Other Specs
-        "otherspecs": "Other_Specs",
-        "specs": "Other_Specs",
-        "parameters": "Other_Specs",
-    }
+# Normalized header (lowercase alphanumerics only) -> canonical BOM column
+_BOM_COLUMN_ALIASES: Dict[str, str] = {
+    # Part name
+    "partname": "Part_Name",
+    "name": "Part_Name",
+    "item": "Part_Name",
+    "component": "Part_Name",
+    # Description
+    "description": "Description",
+    "desc": "Description",
+    # Quantity
+    "qty": "Quantity",
+    "quantity": "Quantity",
+    # Package / footprint
+    "package": "Package",
+    "footprint": "Package",
+    # Voltage
+    "voltage": "Voltage",
+    "volt": "Voltage",
+    # Other Specs
+    "otherspecs": "Other_Specs",
+    "specs": "Other_Specs",
+    "parameters": "Other_Specs",
+}
+_NON_ALNUM_RE = re.compile(r"[\W_]+")
 
+
+def normalize_bom_columns(df: pd.DataFrame) -> pd.DataFrame:
     rename_map: Dict[str, str] = {}
     for col in df.columns:
-        key = norm(str(col))
-        if key in alias_map:
-            rename_map[col] = alias_map[key]
+        # Same as keeping the isalnum() characters, in one C-level pass
+        key = _NON_ALNUM_RE.sub("", str(col).lower())
+        if key in _BOM_COLUMN_ALIASES:
+            rename_map[col] = _BOM_COLUMN_ALIASES[key]
     if rename_map:
         df = df.rename(columns=rename_map)
     return df
@@ -107,27 +177,22 @@ def initialize_database_with_sample_data() -> None:
         samples_path = Path("data/sample_parts.csv")
         if samples_path.exists():
             df = pd.read_csv(samples_path)
-            for _, r in df.iterrows():
-                supplier_name = r.get("Supplier")
-                supplier = session.query(Supplier).filter_by(name=supplier_name).first()
-                if not supplier:
-                    continue
-                price_tiers = [{"qty": 1, "price": str(r.get("Price"))}]
-                part = Part(
-                    supplier_id=supplier.id,
-                    part_number=r.get("Part_Number"),
-                    name=r.get("Name"),
-                    description=r.get("Description"),
-                    package=r.get("Package"),
-                    voltage=r.get("Voltage"),
-                    other_specs=r.get("Other_Specs"),
-                    stock=r.get("Stock"),
-                    price_tiers_json=json.dumps(price_tiers),
-                    datasheet_url=r.get("Datasheet"),
-                    purchase_url=r.get("Purchase_Link"),
-                    image_url=r.get("Image"),
-                )
-                session.add(part)
+            if "Supplier" in df.columns:
+                # Resolve suppliers with one map over the column; unknown names are skipped
+                supplier_ids = {s.name: s.id for s in (tronic, lcsc, mouser)}
+                df = df.assign(supplier_id=df["Supplier"].map(supplier_ids)).dropna(subset=["supplier_id"])
+                if "Price" in df.columns:
+                    tiers = df["Price"].map(lambda p: json.dumps([{"qty": 1, "price": str(p)}]))
+                else:
+                    tiers = json.dumps([{"qty": 1, "price": str(None)}])
+                parts = pd.DataFrame({
+                    "supplier_id": df["supplier_id"].astype(int),
+                    **{col: df[src] if src in df.columns else None for col, src in SAMPLE_PART_COLUMNS.items()},
+                    "price_tiers_json": tiers,
+                })
+                records = parts.to_dict("records")
+                if records:
+                    session.execute(insert(Part), records)
         session.commit()
 
 
@@ -135,32 +200,29 @@ def dataframe_to_download_bytes(df: pd.DataFrame, kind: str = "csv") -> bytes:
     if kind == "csv":
         return df.to_csv(index=False).encode("utf-8")
     elif kind == "xlsx":
+        # Write-only workbook: rows are serialized as they are appended instead of
+        # being held as one Cell object per value until save
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Sheet1")
+        ws.append(list(df.columns))
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            ws.append(row)
         buf = io.BytesIO()
-        with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False)
-        buf.seek(0)
-        return buf.read()
+        wb.save(buf)
+        return buf.getvalue()
     else:
         raise ValueError("Unsupported kind")
 
 
 # -------- Custom product list inference --------
 _url_re = re.compile(r"^https?://", re.IGNORECASE)
-_img_re = re.compile(r"\.(png|jpe?g|gif|webp|bmp)(\?.*)?$", re.IGNORECASE)
-_pdf_re = re.compile(r"\.pdf(\?.*)?$", re.IGNORECASE)
+_img_re = re.compile(r"\.(?:png|jpe?g|gif|webp|bmp)(?:\?.*)?$", re.IGNORECASE)
+_pdf_re = re.compile(r"\.pdf(?:\?.*)?$", re.IGNORECASE)
 
 
 def _norm_header(s: str) -> str:
-    return "".join(ch for ch in s.lower() if ch.isalnum())
-
-
-def _is_url(v: object) -> bool:
-    if v is None:
-        return False
-    try:
-        return bool(_url_re.match(str(v).strip()))
-    except Exception:
-        return False
+    return _NON_ALNUM_RE.sub("", s.lower())
 
 
 def infer_custom_product_mapping(df: pd.DataFrame) -> Dict[str, Optional[str]]:
@@ -180,8 +242,10 @@ def infer_custom_product_mapping(df: pd.DataFrame) -> Dict[str, Optional[str]]:
     price_col = pick_by_keywords(["price", "cost", "unit", "amount", "rate"])
     stock_col = pick_by_keywords(["stock", "availability", "qty", "quantity", "available"])  # note: may be qty
 
-    # URL-based detection
-    url_counts = {h: int(df[h].apply(_is_url).sum()) for h in headers}
+    # URL-based detection; cell text is rendered once per column and matched with vectorized str masks
+    text_cols = {h: df[h].astype(str) for h in headers}
+    url_masks = {h: text_cols[h].str.strip().str.match(_url_re) for h in headers}
+    url_counts = {h: int(url_masks[h].sum()) for h in headers}
 
     # datasheet: prefer pdf urls or header indicates datasheet
     datasheet_col = pick_by_keywords(["datasheet", "datashett", "data", "sheet"]) or None
@@ -192,7 +256,7 @@ def infer_custom_product_mapping(df: pd.DataFrame) -> Dict[str, Optional[str]]:
         for h in headers:
             if url_counts[h] == 0:
                 continue
-            pdf_hits = int(df[h].astype(str).str.contains(_pdf_re).sum())
+            pdf_hits = int(text_cols[h].str.contains(_pdf_re).sum())
             if pdf_hits > best_pdf:
                 best_pdf = pdf_hits
                 best = h
@@ -206,7 +270,7 @@ def infer_custom_product_mapping(df: pd.DataFrame) -> Dict[str, Optional[str]]:
         for h in headers:
             if url_counts[h] == 0:
                 continue
-            img_hits = int(df[h].astype(str).str.contains(_img_re).sum())
+            img_hits = int(text_cols[h].str.contains(_img_re).sum())
             if img_hits > best_img:
                 best_img = img_hits
                 best = h
@@ -220,7 +284,7 @@ def infer_custom_product_mapping(df: pd.DataFrame) -> Dict[str, Optional[str]]:
         for h in headers:
             if url_counts[h] == 0:
                 continue
-            non_asset = int(df[h].apply(lambda v: _is_url(v) and not _img_re.search(str(v)) and not _pdf_re.search(str(v))).sum())
+            non_asset = int((url_masks[h] & ~text_cols[h].str.contains(_img_re) & ~text_cols[h].str.contains(_pdf_re)).sum())
             if non_asset > best_count:
                 best_count = non_asset
                 best = h
@@ -241,100 +305,147 @@ def infer_custom_product_mapping(df: pd.DataFrame) -> Dict[str, Optional[str]]:
     }
 
 
+CUSTOM_RECORD_FIELDS = [
+    "part_number",
+    "name",
+    "description",
+    "price",
+    "stock",
+    "datasheet",
+    "purchase_link",
+    "image",
+]
+
+
 def normalize_custom_records(df: pd.DataFrame, mapping: Dict[str, Optional[str]]) -> List[Dict[str, Optional[str]]]:
-    out: List[Dict[str, Optional[str]]] = []
-    for _, r in df.iterrows():
-        out.append({
-            "part_number": str(r.get(mapping["part_number"])) if mapping.get("part_number") and pd.notna(r.get(mapping["part_number"])) else None,
-            "name": str(r.get(mapping["name"])) if mapping.get("name") and pd.notna(r.get(mapping["name"])) else None,
-            "description": str(r.get(mapping["description"])) if mapping.get("description") and pd.notna(r.get(mapping["description"])) else None,
-            "price": str(r.get(mapping["price"])) if mapping.get("price") and pd.notna(r.get(mapping["price"])) else None,
-            "stock": str(r.get(mapping["stock"])) if mapping.get("stock") and pd.notna(r.get(mapping["stock"])) else None,
-            "datasheet": str(r.get(mapping["datasheet"])) if mapping.get("datasheet") and pd.notna(r.get(mapping["datasheet"])) else None,
-            "purchase_link": str(r.get(mapping["purchase_link"])) if mapping.get("purchase_link") and pd.notna(r.get(mapping["purchase_link"])) else None,
-            "image": str(r.get(mapping["image"])) if mapping.get("image") and pd.notna(r.get(mapping["image"])) else None,
-        })
-    return out
+    # One array for the whole frame, upcast to a common dtype exactly as iterrows() rows
+    # were, so values stringify the same; each field is then converted column-at-a-time
+    values = df.to_numpy()
+    columns: List[List[Optional[str]]] = []
+    for field in CUSTOM_RECORD_FIELDS:
+        src = mapping.get(field)
+        if not src or src not in df.columns:
+            columns.append([None] * len(df))
+            continue
+        col = values[:, df.columns.get_loc(src)]
+        present = pd.notna(col).tolist()
+        columns.append([str(v) if ok else None for v, ok in zip(col.tolist(), present)])
+    return [dict(zip(CUSTOM_RECORD_FIELDS, row)) for row in zip(*columns)]
+
+
+_ws_re = re.compile(r"\s+")
 
 
+@lru_cache(maxsize=8192, typed=True)
 def _normalize_text(value: Optional[str]) -> str:
     if value is None:
         return ""
-    return " ".join(str(value).lower().split())
+    return _ws_re.sub(" ", str(value).lower()).strip()
+
+
+# Upper bound on BOM x parts score cells held at once while matching against a parts list
+_MATCH_BLOCK_CELLS = 4_000_000
+
+# Parts list column -> updated BOM column carrying the matched value
+_PARTS_LIST_MATCH_COLUMNS = [
+    ("Category", "Matched_Category"),
+    ("Category-href", "Matched_Category_href"),
+    ("Name", "Matched_Name"),
+    ("Code", "Matched_Code"),
+    ("Price", "Matched_Price"),
+    ("Description", "Matched_Description"),
+    ("Img", "Matched_Img"),
+]
 
 
 def match_bom_to_parts_list(bom_df: pd.DataFrame, parts_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     from rapidfuzz import fuzz
+    from rapidfuzz.process import cdist
     from sklearn.feature_extraction.text import TfidfVectorizer
     from sklearn.metrics.pairwise import cosine_similarity
 
+    if len(bom_df) == 0:
+        # Nothing to score (e.g. a header-only BOM file); the vectorizer rejects zero rows
+        return pd.DataFrame(), pd.DataFrame()
+
     # Prepare parts text corpus (Description + Name)
     parts_desc = parts_df.get("Description", pd.Series([""] * len(parts_df)))
     parts_name = parts_df.get("Name", pd.Series([""] * len(parts_df)))
     parts_text = (parts_desc.fillna("") + " " + parts_name.fillna("")).apply(_normalize_text)
+    # Normalized once here rather than for every BOM row
+    parts_name_norm = parts_name.fillna("").apply(_normalize_text).tolist()
 
-    vectorizer = TfidfVectorizer(stop_words="english")
+    # float32 weights halve the CSR matrix and the bytes the blocked cosine matmuls stream
+    vectorizer = TfidfVectorizer(stop_words="english", dtype=np.float32)
     parts_matrix = vectorizer.fit_transform(parts_text.tolist())
 
-    matched_rows = []
-    updated_bom_rows = []
-
-    for _, b in bom_df.iterrows():
-        bom_name = _normalize_text(b.get("Part_Name"))
-        bom_specs = _normalize_text(b.get("Description")) + " " + _normalize_text(b.get("Package")) + " " + _normalize_text(b.get("Voltage")) + " " + _normalize_text(b.get("Other_Specs"))
-        bom_vec = vectorizer.transform([bom_specs])
-        tfidf_scores = cosine_similarity(bom_vec, parts_matrix).ravel() * 100.0  # 0-100
-
-        # Fuzzy name ratio
-        name_scores = parts_name.fillna("").apply(lambda x: float(fuzz.ratio(bom_name, _normalize_text(x))))
-
-        total_scores = 0.8 * tfidf_scores + 0.2 * name_scores.values
-        best_idx = int(total_scores.argmax()) if len(total_scores) else -1
-
-        if best_idx >= 0:
-            pr = parts_df.iloc[best_idx]
-            # Build matched parts table row (Updated Parts List format)
-            matched_rows.append({
-                "Category": pr.get("Category"),
-                "Category-href": pr.get("Category-href"),
-                "Name": pr.get("Name"),
-                "Code": pr.get("Code"),
-                "Price": pr.get("Price"),
-                "Description": pr.get("Description"),
-                "Img": pr.get("Img"),
-                "_similarity": round(float(total_scores[best_idx]), 1),
-            })
-            # Build updated BOM row (original BOM fields + matched fields)
-            updated_row = b.to_dict()
-            updated_row.update({
-                "Matched_Category": pr.get("Category"),
-                "Matched_Category_href": pr.get("Category-href"),
-                "Matched_Name": pr.get("Name"),
-                "Matched_Code": pr.get("Code"),
-                "Matched_Price": pr.get("Price"),
-                "Matched_Description": pr.get("Description"),
-                "Matched_Img": pr.get("Img"),
-                "Matched_Similarity": round(float(total_scores[best_idx]), 1),
-            })
-            updated_bom_rows.append(updated_row)
-        else:
-            # No parts; keep BOM with NaNs on matched fields
-            updated_row = b.to_dict()
-            updated_row.update({
-                "Matched_Category": None,
-                "Matched_Category_href": None,
-                "Matched_Name": None,
-                "Matched_Code": None,
-                "Matched_Price": None,
-                "Matched_Description": None,
-                "Matched_Img": None,
-                "Matched_Similarity": 0.0,
-            })
-            updated_bom_rows.append(updated_row)
-
-    matched_df = pd.DataFrame(matched_rows)
-    # Return only the specified columns for matched table (drop similarity helper)
-    if not matched_df.empty and "_similarity" in matched_df.columns:
-        matched_df = matched_df.drop(columns=["_similarity"])
-    updated_bom_df = pd.DataFrame(updated_bom_rows)
+    # BOM columns as one array with the same upcasting iterrows() rows get
+    bom_values = bom_df.to_numpy()
+
+    def bom_column(col: str) -> List[object]:
+        if col in bom_df.columns:
+            return bom_values[:, bom_df.columns.get_loc(col)].tolist()
+        return [None] * len(bom_df)
+
+    bom_names = [_normalize_text(v) for v in bom_column("Part_Name")]
+    bom_specs = [
+        " ".join(_normalize_text(v) for v in fields)
+        for fields in zip(bom_column("Description"), bom_column("Package"), bom_column("Voltage"), bom_column("Other_Specs"))
+    ]
+    # All BOM rows go through the vectorizer in one call
+    bom_matrix = vectorizer.transform(bom_specs)
+
+    best_indices = np.full(len(bom_df), -1, dtype=np.int64)
+    best_scores = np.zeros(len(bom_df))
+    n_parts = parts_matrix.shape[0]
+    if n_parts:
+        # Score a block of BOM rows per sparse matmul, sized so the dense block stays bounded
+        block = max(1, _MATCH_BLOCK_CELLS // n_parts)
+        for start in range(0, len(bom_df), block):
+            stop = min(start + block, len(bom_df))
+            tfidf_scores = cosine_similarity(bom_matrix[start:stop], parts_matrix)
+            tfidf_scores *= 100.0  # 0-100
+            # Fuzzy name ratio for the whole block in one multi-threaded rapidfuzz call
+            name_scores = cdist(bom_names[start:stop], parts_name_norm, scorer=fuzz.ratio, dtype=np.float64, workers=-1)
+            # 0.8 * tfidf + 0.2 * name, combined in place in the float64 name block
+            tfidf_scores *= 0.8
+            total_scores = name_scores
+            total_scores *= 0.2
+            total_scores += tfidf_scores
+            block_best = total_scores.argmax(axis=1)
+            best_indices[start:stop] = block_best
+            best_scores[start:stop] = total_scores[np.arange(stop - start), block_best]
+
+    if n_parts:
+        # Gather each matched field with one fancy index instead of an iloc row per BOM row
+        parts_values = parts_df.to_numpy()
+
+        def matched_column(col: str) -> List[object]:
+            if col in parts_df.columns:
+                return list(parts_values[:, parts_df.columns.get_loc(col)][best_indices])
+            return [None] * len(bom_df)
+
+        matched_columns = [matched_column(col) for col, _ in _PARTS_LIST_MATCH_COLUMNS]
+        similarities = [round(float(score), 1) for score in best_scores]
+    else:
+        # No parts; keep BOM with NaNs on matched fields
+        matched_columns = [[None] * len(bom_df) for _ in _PARTS_LIST_MATCH_COLUMNS]
+        similarities = [0.0] * len(bom_df)
+
+    # Matched parts table (Updated Parts List format), built straight from the gathered columns
+    if n_parts and len(bom_df):
+        matched_df = pd.DataFrame({col: values for (col, _), values in zip(_PARTS_LIST_MATCH_COLUMNS, matched_columns)})
+    else:
+        matched_df = pd.DataFrame()
+
+    # Updated BOM: the BOM columns plus the gathered matches, assigned a column at a time
+    if bom_values.dtype != object:
+        # An all-numeric BOM keeps its rows' common dtype (ints alongside floats come out as float)
+        updated_bom_df = pd.DataFrame(bom_values, columns=bom_df.columns)
+    else:
+        # Mixed BOMs keep each column's own dtype; object columns holding e.g. only ints are narrowed
+        updated_bom_df = bom_df.reset_index(drop=True).infer_objects()
+    for (_, matched_col), values in zip(_PARTS_LIST_MATCH_COLUMNS, matched_columns):
+        updated_bom_df[matched_col] = values
+    updated_bom_df["Matched_Similarity"] = similarities
     return matched_df, updated_bom_df
\ No newline at end of file
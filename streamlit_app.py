@@ -1,16 +1,24 @@
 import os
 import io
 import json
+import hashlib
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from functools import partial
+from itertools import chain
+from pathlib import Path
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 # Ensure local package resolution
 import bootstrap  # noqa: F401
 import streamlit as st
-from sqlalchemy.orm import Session
+from streamlit.errors import StreamlitAPIException
+from sqlalchemy import exists, func, insert, select
+from sqlalchemy.orm import Session, joinedload
 
 from app.db import get_session, ensure_db_initialized
 from app.models import Part, Supplier, SupplierRule
@@ -21,19 +29,392 @@ from app.utils import (
     dataframe_to_download_bytes,
     normalize_bom_columns,
 )
-from app.matching import find_best_matches_for_bom
-from app.scheduler import get_last_update_time, write_progress, read_progress
+from app.matching import catalog_version, find_best_matches_for_bom
+from app.scheduler import get_last_update_time, write_progress, read_progress_many
 from app.runner import run_all_scrapers
 
 APP_TITLE = "BOM Sourcing & Suggestion Platform"
+CUSTOM_INSERT_BATCH_SIZE = 500
+RESULTS_PAGE_SIZE = 200
+BOM_JOB_POLL_SECONDS = 1.0
+PROGRESS_POLL_SECONDS = 2.0
+# Inventory grid column -> selected column; Price holds the raw tiers JSON until parsed
+INVENTORY_COLUMNS = {
+    "Supplier": Supplier.name,
+    "Part Number": Part.part_number,
+    "Name": Part.name,
+    "Description": Part.description,
+    "Stock": Part.stock,
+    "Price": Part.price_tiers_json,
+    "Datasheet": Part.datasheet_url,
+    "Purchase": Part.purchase_url,
+    "Image": Part.image_url,
+}
+SIMILARITY_BAND_COLUMN = st.column_config.TextColumn("Match", help="🟢 exact · 🟡 ≥ 70% · 🔴 below 70%", width="small")
 
 st.set_page_config(page_title=APP_TITLE, layout="wide")
 # Header
 st.title(APP_TITLE)
 st.caption("Find exact and alternative electronic parts across multiple suppliers.")
 
+
+@st.cache_resource
+def _init_db() -> bool:
+    # Schema checks run once per server process, not on every widget rerun
+    ensure_db_initialized()
+    return True
+
+
+@st.cache_data(ttl=30, show_spinner=False, refresh_mode="background")
+def load_suppliers() -> List[Dict[str, Any]]:
+    """Suppliers ordered by name; cleared whenever a supplier is created, saved or deleted."""
+    with get_session() as session:
+        # Plain column rows; no ORM objects are hydrated just to read three fields
+        rows = session.query(Supplier.id, Supplier.name, Supplier.is_active).order_by(Supplier.name).all()
+    return [{"id": sid, "name": name, "is_active": is_active} for sid, name, is_active in rows]
+
+
+@st.cache_data(ttl=60, show_spinner=False, refresh_mode="background")
+def _last_update_time() -> str:
+    # Sidebar caption only; once the ttl lapses the stale value is shown while a fresh read runs in the background
+    return get_last_update_time()
+
+
+@st.cache_resource
+def _bom_template_bytes() -> bytes:
+    # Read once per process; the download button needs the bytes on every rerun
+    return Path("data/bom_template.csv").read_bytes()
+
+
+@st.cache_data(ttl=3600, max_entries=8, show_spinner=False)
+def _read_upload(file_bytes: bytes, name: str) -> pd.DataFrame:
+    """Parsed upload keyed on its bytes, so widget reruns after an upload skip the CSV/Excel parse."""
+    buf = io.BytesIO(file_bytes)
+    buf.name = name
+    return read_bom_file(buf)
+
+
+def _page_slice(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Rows of the selected page; a page picker is shown only when df is longer than one page."""
+    if len(df) <= RESULTS_PAGE_SIZE:
+        return df
+    pages = (len(df) + RESULTS_PAGE_SIZE - 1) // RESULTS_PAGE_SIZE
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1, key=key)
+    start = (int(page) - 1) * RESULTS_PAGE_SIZE
+    return df.iloc[start:start + RESULTS_PAGE_SIZE]
+
+
+def _with_similarity_band(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of df led by a Match column: 🟢 exact, 🟡 70% or better, 🔴 below (or not a number)."""
+    v = pd.to_numeric(df["Similarity %"], errors="coerce").to_numpy(dtype=float)
+    out = df.copy()
+    out.insert(0, "Match", np.select([v >= 100, v >= 70], ["🟢", "🟡"], default="🔴"))
+    return out
+
+
+@st.cache_data(ttl=3600, max_entries=8, show_spinner=False)
+def _match_bom(
+    bom_df: pd.DataFrame,
+    min_similarity: int,
+    in_stock_only: bool,
+    supplier_filter: Tuple[str, ...],
+    catalog_key: Tuple[Any, ...],
+    _progress_cb: Optional[Callable[[float], None]] = None,
+) -> Tuple[pd.DataFrame, Dict[int, List[Dict[str, Any]]]]:
+    """Matching results for identical inputs; catalog_key makes new or rescraped parts miss the cache."""
+    with get_session() as session:
+        return find_best_matches_for_bom(
+            session=session,
+            bom_df=bom_df,
+            min_similarity=min_similarity,
+            in_stock_only=in_stock_only,
+            supplier_filter=list(supplier_filter),
+            progress_cb=_progress_cb,
+        )
+
+
+def _primary_price(price_json: Optional[str]) -> Optional[str]:
+    if not price_json:
+        return None
+    try:
+        tiers = json.loads(price_json)
+        if isinstance(tiers, list) and tiers:
+            return tiers[0].get("price") or tiers[0].get("unit_price")
+    except Exception:
+        return None
+    return None
+
+
+@st.cache_data(ttl=15, max_entries=32, show_spinner=False)
+def _inventory_page(supplier_names: Tuple[str, ...], page_num: int, page_size: int) -> Tuple[int, pd.DataFrame]:
+    """Filtered total and one page of parts; cleared on ingest/delete, otherwise refreshed by the ttl."""
+    # Plain column rows: no Part instances or identity-map entries for a read-only grid
+    stmt = select(*INVENTORY_COLUMNS.values()).select_from(Part).join(Supplier)
+    count_stmt = select(func.count(Part.id)).select_from(Part).join(Supplier)
+    if supplier_names:
+        stmt = stmt.where(Supplier.name.in_(supplier_names))
+        count_stmt = count_stmt.where(Supplier.name.in_(supplier_names))
+    with get_session() as session:
+        total = session.scalar(count_stmt)
+        rows = session.execute(
+            stmt.order_by(Part.id.desc()).offset((page_num - 1) * page_size).limit(page_size)
+        ).all()
+    inv_df = pd.DataFrame.from_records(rows, columns=list(INVENTORY_COLUMNS))
+    inv_df["Price"] = [_primary_price(row.price_tiers_json) for row in rows]
+    return total, inv_df
+
+
+@st.fragment(run_every=PROGRESS_POLL_SECONDS)
+def _render_scrape_progress(supplier_rows: List[Dict[str, Any]]) -> None:
+    """Live progress for all suppliers (table) and the first one (bar); polls without rerunning the page."""
+    progress = read_progress_many(f"scrape:{s['name']}" for s in supplier_rows)
+    rows = []
+    for s in supplier_rows:
+        p = progress[f"scrape:{s['name']}"]
+        status = p.get("status", "idle")
+        if status == "error":
+            status_label = "Failed"
+        elif status == "skipped":
+            status_label = "Skipped"
+        elif status == "done":
+            status_label = "Completed"
+        elif status == "running":
+            status_label = "Running"
+        else:
+            status_label = "Idle"
+        rows.append({
+            "Supplier": s["name"],
+            "Status": status_label,
+            "Progress %": p.get("pct", 0.0),
+            "Scraped": p.get("scraped", 0),
+            "Stored": p.get("stored", 0),
+        })
+    grid_col, bar_col = st.columns([2, 1])
+    with grid_col:
+        st.dataframe(pd.DataFrame(rows), use_container_width=True)
+    with bar_col:
+        if supplier_rows:
+            prog = progress[f"scrape:{supplier_rows[0]['name']}"]
+            st.progress(min(max(float(prog.get("pct", 0.0)) / 100.0, 0.0), 1.0), text=f"{supplier_rows[0]['name']}: {prog.get('pct', 0)}%")
+            st.metric("Stored", value=prog.get("stored", 0), delta=None)
+
+
+@st.cache_resource
+def _scrape_runner() -> Dict[str, Any]:
+    # One worker per server process, shared by every session, so two clicks can't run overlapping scrapes
+    return {
+        "executor": ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrape"),
+        "future": None,
+        "lock": threading.Lock(),
+    }
+
+
+def _scrape_all_job() -> None:
+    with get_session() as session:
+        write_progress("scrape:all", {"pct": 0.0, "scraped": 0, "stored": 0, "status": "running"})
+        run_all_scrapers(session, progress_key="scrape:all", batch_size=500)
+
+
+def _start_scrape_run() -> bool:
+    """Submit a full scrape unless one is already queued or running; False when it was skipped."""
+    runner = _scrape_runner()
+    with runner["lock"]:
+        future = runner["future"]
+        if future is not None and not future.done():
+            return False
+        runner["future"] = runner["executor"].submit(_scrape_all_job)
+    return True
+
+
+class _BomJob:
+    """Progress and outcome of one background BOM match; every field is read and written under lock."""
+
+    def __init__(self, bom_key: Tuple[Any, ...]) -> None:
+        self.bom_key = bom_key
+        self.lock = threading.Lock()
+        self.pct = 0.0
+        self.error: Optional[str] = None
+        self.result: Optional[Tuple[Any, ...]] = None
+
+    def snapshot(self) -> Tuple[float, Optional[str], Optional[Tuple[Any, ...]]]:
+        with self.lock:
+            return self.pct, self.error, self.result
+
+
+def _process_bom_job(job: _BomJob, bom_df: pd.DataFrame, catalog_key: Tuple[Any, ...]) -> None:
+    """Worker-thread body: match the BOM and leave the outcome on the job; it never touches Streamlit state."""
+    _, min_similarity, in_stock_only, supplier_filter = job.bom_key
+    start = time.time()
+
+    def report(pct: float) -> None:
+        with job.lock:
+            job.pct = pct
+
+    try:
+        results_df, suggestions_map = _match_bom(
+            bom_df, min_similarity, in_stock_only, supplier_filter, catalog_key, _progress_cb=report
+        )
+    except Exception as exc:
+        with job.lock:
+            job.pct, job.error = 100.0, str(exc)
+        return
+    with job.lock:
+        job.pct = 100.0
+        job.result = (job.bom_key, results_df, suggestions_map, time.time() - start)
+
+
+def _collect_bom_job() -> Optional[_BomJob]:
+    """Move a finished job's results into session state; returns the job while it is running or failed."""
+    job = st.session_state.get("bom_job")
+    if job is None:
+        return None
+    _, _, result = job.snapshot()
+    if result is None:
+        return job
+    st.session_state["bom_results"] = result
+    st.session_state["bom_job"] = None
+    return None
+
+
+@st.fragment(run_every=BOM_JOB_POLL_SECONDS)
+def _bom_job_status(bom_key: Tuple[Any, ...]) -> None:
+    """Progress bar for a running job; once it finishes or fails, a full rerun shows the outcome."""
+    job = _collect_bom_job()
+    if job is None or job.bom_key != bom_key:
+        st.rerun()
+    pct, error, _ = job.snapshot()
+    if error is not None:
+        st.rerun()
+    st.progress(min(max(pct / 100.0, 0.0), 1.0), text=f"Processing your BOM... {pct:.0f}%")
+
+
+@st.fragment
+def _render_bom_results(bom_df: pd.DataFrame, bom_key: Tuple[Any, ...]) -> None:
+    """Tables, suggestions and exports for the stored results; paging and exports rerun only this block."""
+    stored_results = st.session_state.get("bom_results")
+    if stored_results is not None and stored_results[0] == bom_key:
+        _, results_df, suggestions_map, elapsed = stored_results
+        st.success(f"Processing done in {elapsed:.1f}s")
+
+        st.subheader("🔍 Available Matches")
+        available_df = results_df[results_df["Status"] == "Available"]
+        if not available_df.empty:
+            st.dataframe(
+                _with_similarity_band(_page_slice(available_df, "available_page")),
+                use_container_width=True,
+                column_config={
+                    "Match": SIMILARITY_BAND_COLUMN,
+                    "Image": st.column_config.ImageColumn("Image", help="Product image", width="small"),
+                    "Datasheet Link": st.column_config.LinkColumn("Datasheet Link"),
+                    "Purchase Link": st.column_config.LinkColumn("Purchase Link"),
+                },
+            )
+        else:
+            st.caption("No direct matches found above the similarity threshold.")
+
+        st.subheader("❌ Unavailable in Store")
+        unavailable_df = results_df[results_df["Status"] == "Unavailable"]
+        if not unavailable_df.empty:
+            st.dataframe(
+                _page_slice(unavailable_df[["BOM Part Name", "Similarity %", "Status"]], "unavailable_page"),
+                use_container_width=True,
+            )
+
+        # Suggestions with add-to-available capability
+        st.subheader("▼ Suggestions (Unique Alternatives)")
+        all_suggestions = list(chain.from_iterable(suggestions_map.values()))
+        if all_suggestions:
+            # One hash-based dedup in pandas; keeps the first occurrence of each alternative
+            suggestions_df = (
+                pd.DataFrame(all_suggestions)
+                .drop_duplicates(subset=["supplier", "found_part_name", "purchase_link"])
+                .reset_index(drop=True)
+            )
+            if not suggestions_df.empty:
+                suggestions_df = suggestions_df[[
+                    "found_part_name",
+                    "supplier",
+                    "price",
+                    "stock",
+                    "image",
+                    "datasheet_link",
+                    "purchase_link",
+                    "similarity",
+                ]]
+                suggestions_df.rename(columns={
+                    "found_part_name": "Found Part Name",
+                    "supplier": "Supplier",
+                    "price": "Price",
+                    "stock": "Stock Availability",
+                    "image": "Image",
+                    "datasheet_link": "Datasheet Link",
+                    "purchase_link": "Purchase Link",
+                    "similarity": "Similarity %",
+                }, inplace=True)
+            st.dataframe(
+                _with_similarity_band(_page_slice(suggestions_df, "suggestions_page")),
+                use_container_width=True,
+                column_config={
+                    "Match": SIMILARITY_BAND_COLUMN,
+                    "Image": st.column_config.ImageColumn("Image", help="Product image", width="small"),
+                    "Datasheet Link": st.column_config.LinkColumn("Datasheet Link"),
+                    "Purchase Link": st.column_config.LinkColumn("Purchase Link"),
+                },
+            )
+            # Add one of the suggestions to Available Matches
+            with st.form("add_suggestion_form"):
+                st.caption("Add a suggested item to Available Matches")
+                sel_idx = st.selectbox(
+                    "Choose suggestion",
+                    options=list(range(len(suggestions_df))),
+                    format_func=lambda i: f"{suggestions_df.iloc[i]['Found Part Name']} ({suggestions_df.iloc[i]['Supplier']})",
+                )
+                add_submit = st.form_submit_button("Add to Available")
+                if add_submit:
+                    row = suggestions_df.iloc[int(sel_idx)].to_dict()
+                    # Construct a new available row with minimal required fields
+                    new_row = {
+                        "Status": "Available",
+                        "BOM Part Name": row.get("Found Part Name"),
+                        "Found Part Name": row.get("Found Part Name"),
+                        "Supplier": row.get("Supplier"),
+                        "Price": row.get("Price"),
+                        "Stock Availability": row.get("Stock Availability"),
+                        "Image": row.get("Image"),
+                        "Datasheet Link": row.get("Datasheet Link"),
+                        "Purchase Link": row.get("Purchase Link"),
+                        "Similarity %": row.get("Similarity %", 0.0),
+                    }
+                    results_df = pd.concat([results_df, pd.DataFrame([new_row])], ignore_index=True)
+                    st.session_state["bom_results"] = (bom_key, results_df, suggestions_map, elapsed)
+                    # Re-render the fragment so the tables and exports pick up the appended row
+                    st.session_state["bom_suggestion_added"] = True
+                    try:
+                        st.rerun(scope="fragment")
+                    except StreamlitAPIException:
+                        # Submitted during a full-app run, where only a full rerun is allowed
+                        st.rerun()
+                if st.session_state.pop("bom_suggestion_added", False):
+                    st.success("Suggestion added to Available Matches. Exports will include it.")
+        else:
+            st.caption("No alternative suggestions available.")
+
+        from app.budget_excel import build_budget_excel
+        # Exports are built only when their button is clicked, not on every render
+        csv_export = partial(dataframe_to_download_bytes, results_df, kind="csv")
+        xlsx_export = partial(dataframe_to_download_bytes, results_df, kind="xlsx")
+        budget_export = partial(build_budget_excel, bom_df=bom_df, results_df=results_df)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button("⬇ Download CSV", data=csv_export, file_name="bom_results.csv", mime="text/csv")
+        with col2:
+            st.download_button("⬇ Download Excel", data=xlsx_export, file_name="bom_results.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        with col3:
+            st.download_button("📊 Download Budget Excel", data=budget_export, file_name="bom_budget.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
 # Ensure DB initialized and seed sample data on first run
-ensure_db_initialized()
+_init_db()
 
 # Sidebar controls
 with st.sidebar:
@@ -41,30 +422,25 @@ with st.sidebar:
     min_similarity = st.slider("Minimum Similarity %", min_value=0, max_value=100, value=70, step=5)
     in_stock_only = st.checkbox("In-stock only", value=False)
 
-    with get_session() as session:
-        supplier_names = [s.name for s in session.query(Supplier).order_by(Supplier.name).all()]
+    supplier_names = [s["name"] for s in load_suppliers()]
     supplier_filter = st.multiselect("Suppliers", options=supplier_names, default=supplier_names)
 
     st.divider()
     st.subheader("Database")
-    last_update = get_last_update_time()
+    last_update = _last_update_time()
     st.caption(f"Last Database Update: {last_update if last_update else 'Never'}")
     if st.button("Refresh Database (Background)"):
-        def _bg_refresh():
-            with get_session() as session:
-                write_progress("scrape:all", {"pct": 0.0, "scraped": 0, "stored": 0, "status": "running"})
-                run_all_scrapers(session, progress_key="scrape:all", batch_size=500)
-        threading.Thread(target=_bg_refresh, daemon=True).start()
-        st.success("Refresh started. Check progress in the Suppliers & Scraping Runner tab.")
+        if _start_scrape_run():
+            st.success("Refresh started. Check progress in the Suppliers & Scraping Runner tab.")
+        else:
+            st.info("A scrape is already running. Check progress in the Suppliers & Scraping Runner tab.")
 
 # Tabs for usability
 tab_bom, tab_suppliers, tab_inventory = st.tabs(["📂 BOM", "🛠️ Suppliers & Scraping Runner", "📦 Inventory by Supplier"])
 
 with tab_suppliers:
     st.subheader("Supplier Settings & Scraping")
-    with get_session() as session:
-        suppliers = session.query(Supplier).order_by(Supplier.name).all()
-        supplier_rows = [{"id": s.id, "name": s.name, "is_active": s.is_active} for s in suppliers]
+    supplier_rows = load_suppliers()
 
     add_expander = st.expander("➕ Add New Supplier", expanded=False)
     with add_expander:
@@ -83,32 +459,25 @@ with tab_suppliers:
                         if session.query(Supplier).filter_by(name=new_name.strip()).first():
                             st.error("Supplier with this name already exists.")
                         else:
-                            sup = Supplier(name=new_name.strip(), base_url=new_base.strip() or None)
-                            session.add(sup)
-                            session.flush()
+                            # The rule rides on the relationship; its supplier_id is filled in when both rows are flushed at commit
                             rule = SupplierRule(
-                                supplier_id=sup.id,
                                 search_url_template=new_search.strip() or None,
                                 sitemap_json=new_sitemap.strip() or None,
                                 is_enabled=bool(new_enabled),
                             )
-                            session.add(rule)
+                            session.add(Supplier(name=new_name.strip(), base_url=new_base.strip() or None, rules=[rule]))
                             session.commit()
+                            load_suppliers.clear()
+                            _match_bom.clear()
                             st.success("Supplier created.")
 
     st.markdown("---")
 
-    sel_col2, sel_col3 = st.columns([1, 1])
-    with sel_col2:
-        run_all = st.button("Run All Scrapers (Background)")
-    with sel_col3:
-        refresh_progress = st.button("Refresh Progress")
+    run_all = st.button("Run All Scrapers (Background)")
 
     manage_expander = st.expander("✏️ Select & Manage Supplier", expanded=False)
     with manage_expander:
-        with get_session() as session:
-            suppliers = session.query(Supplier).order_by(Supplier.name).all()
-            supplier_rows = [{"id": s.id, "name": s.name, "is_active": s.is_active} for s in suppliers]
+        supplier_rows = load_suppliers()
         sel_name = st.selectbox("Select supplier", options=[s["name"] for s in supplier_rows] if supplier_rows else [])
 
         # Allow custom uploads for a supplier (pre-scraped list)
@@ -118,21 +487,8 @@ with tab_suppliers:
             custom_file = st.file_uploader("Custom Product File", type=["csv", "xlsx"], key="custom_csv")
             if custom_file is not None and sel_name:
                 try:
-                    # Robust read for CSV/Excel
-                    if custom_file.name.lower().endswith(".csv"):
-                        raw = custom_file.read()
-                        df = None
-                        for enc in ("utf-8", "utf-8-sig", "cp1252", "latin1"):
-                            try:
-                                text = raw.decode(enc)
-                                df = pd.read_csv(io.StringIO(text))
-                                break
-                            except Exception:
-                                df = None
-                        if df is None:
-                            raise ValueError("Unable to decode CSV with common encodings")
-                    else:
-                        df = pd.read_excel(custom_file)
+                    # Robust read for CSV/Excel; CSV bytes go straight to the C parser
+                    df = _read_upload(custom_file.getvalue(), custom_file.name)
                     st.dataframe(df.head(50), use_container_width=True)
                     if st.button("Ingest Custom List"):
                         from app.utils import infer_custom_product_mapping, normalize_custom_records
@@ -143,23 +499,26 @@ with tab_suppliers:
                             if not sup:
                                 st.error("Selected supplier not found.")
                             else:
-                                to_insert = []
-                                for rec in records:
-                                    part = Part(
-                                        supplier_id=sup.id,
-                                        part_number=rec.get("part_number"),
-                                        name=rec.get("name"),
-                                        description=rec.get("description"),
-                                        stock=rec.get("stock"),
-                                        price_tiers_json=json.dumps([{ "qty": 1, "price": rec.get("price") or "" }]),
-                                        datasheet_url=rec.get("datasheet"),
-                                        purchase_url=rec.get("purchase_link"),
-                                        image_url=rec.get("image"),
-                                    )
-                                    to_insert.append(part)
+                                to_insert = [
+                                    {
+                                        "supplier_id": sup.id,
+                                        "part_number": rec.get("part_number"),
+                                        "name": rec.get("name"),
+                                        "description": rec.get("description"),
+                                        "stock": rec.get("stock"),
+                                        "price_tiers_json": json.dumps([{ "qty": 1, "price": rec.get("price") or "" }]),
+                                        "datasheet_url": rec.get("datasheet"),
+                                        "purchase_url": rec.get("purchase_link"),
+                                        "image_url": rec.get("image"),
+                                    }
+                                    for rec in records
+                                ]
                                 if to_insert:
-                                    session.bulk_save_objects(to_insert, return_defaults=False)
+                                    # Core executemany in fixed-size batches; skips ORM object construction
+                                    for start in range(0, len(to_insert), CUSTOM_INSERT_BATCH_SIZE):
+                                        session.execute(insert(Part), to_insert[start:start + CUSTOM_INSERT_BATCH_SIZE])
                                     session.commit()
+                                    _inventory_page.clear()
                                     st.success(f"Ingested {len(to_insert)} products into {sel_name}.")
                 except Exception as exc:
                     st.error(f"Failed to read custom CSV: {exc}")
@@ -167,8 +526,11 @@ with tab_suppliers:
         if sel_name:
             selected = next(s for s in supplier_rows if s["name"] == sel_name)
             with get_session() as session:
-                supplier = session.get(Supplier, selected["id"])  # type: ignore[arg-type]
-                rule = session.query(SupplierRule).filter_by(supplier_id=supplier.id).first()
+                # Supplier and its rules in one SELECT ... LEFT OUTER JOIN
+                supplier = session.execute(
+                    select(Supplier).options(joinedload(Supplier.rules)).where(Supplier.id == selected["id"])
+                ).unique().scalar_one()
+                rule = supplier.rules[0] if supplier.rules else None
 
             col1, col2 = st.columns(2)
             with col1:
@@ -184,15 +546,20 @@ with tab_suppliers:
             with btn_col1:
                 if st.button("Save Supplier Settings"):
                     with get_session() as session:
-                        s = session.get(Supplier, supplier.id)
+                        s = session.execute(
+                            select(Supplier).options(joinedload(Supplier.rules)).where(Supplier.id == supplier.id)
+                        ).unique().scalar_one()
                         s.is_active = is_active
-                        r = session.query(SupplierRule).filter_by(supplier_id=s.id).first()
+                        r = s.rules[0] if s.rules else None
                         if not r:
-                            r = SupplierRule(supplier_id=s.id)
-                            session.add(r)
+                            r = SupplierRule()
+                            s.rules.append(r)
                         r.is_enabled = rule_enabled
                         r.sitemap_json = new_json.strip() or None
                         session.commit()
+                    # Rule changes alter purchase-link fallbacks without touching parts
+                    load_suppliers.clear()
+                    _match_bom.clear()
                     st.success("Saved supplier and rule settings.")
             with btn_col2:
                 st.markdown("**Danger Zone**")
@@ -206,48 +573,20 @@ with tab_suppliers:
                             if sup:
                                 session.delete(sup)
                                 session.commit()
+                                load_suppliers.clear()
+                                _match_bom.clear()
+                                _inventory_page.clear()
                                 st.success(f"Deleted supplier '{supplier.name}'. Please refresh the page.")
 
-        # Live progress for all suppliers (table) and selected one (bar)
-        with get_session() as session:
-            all_suppliers = session.query(Supplier).order_by(Supplier.name).all()
-        rows = []
-        for s in all_suppliers:
-            p = read_progress(f"scrape:{s.name}")
-            status = p.get("status", "idle")
-            if status == "error":
-                status_label = "Failed"
-            elif status == "skipped":
-                status_label = "Skipped"
-            elif status == "done":
-                status_label = "Completed"
-            elif status == "running":
-                status_label = "Running"
-            else:
-                status_label = "Idle"
-            rows.append({
-                "Supplier": s.name,
-                "Status": status_label,
-                "Progress %": p.get("pct", 0.0),
-                "Scraped": p.get("scraped", 0),
-                "Stored": p.get("stored", 0),
-            })
-        grid_col, bar_col = st.columns([2, 1])
-        with grid_col:
-            st.dataframe(pd.DataFrame(rows), use_container_width=True)
-        with bar_col:
-            if supplier_rows:
-                prog = read_progress(f"scrape:{supplier_rows[0]['name']}")
-                st.progress(min(max(float(prog.get("pct", 0.0)) / 100.0, 0.0), 1.0), text=f"{supplier_rows[0]['name']}: {prog.get('pct', 0)}%")
-                st.metric("Stored", value=prog.get("stored", 0), delta=None)
+        # Re-read after any create/delete above cleared the cache
+        supplier_rows = load_suppliers()
+        _render_scrape_progress(supplier_rows)
 
     if run_all:
-        def _bg_run():
-            with get_session() as session:
-                write_progress("scrape:all", {"pct": 0.0, "scraped": 0, "stored": 0, "status": "running"})
-                run_all_scrapers(session, progress_key="scrape:all", batch_size=500)
-        threading.Thread(target=_bg_run, daemon=True).start()
-        st.success("Scraping started in background. Progress will update live.")
+        if _start_scrape_run():
+            st.success("Scraping started in background. Progress will update live.")
+        else:
+            st.info("A scrape is already running. Progress will update live.")
 
 with tab_bom:
     st.subheader("Upload & Process BOM")
@@ -258,19 +597,20 @@ with tab_bom:
     with col_b:
         st.download_button(
             label="Download Template",
-            data=open("data/bom_template.csv", "rb").read(),
+            data=_bom_template_bytes(),
             file_name="bom_template.csv",
             mime="text/csv",
         )
 
     with get_session() as session:
-        total_parts = session.query(Part).count()
-    if total_parts == 0:
+        # EXISTS stops at the first row instead of counting the whole parts table on every rerun
+        has_parts = session.scalar(select(exists().select_from(Part)))
+    if not has_parts:
         st.warning("No supplier data found. Please run scrapers or upload a custom list first.")
 
     if uploaded_file is not None:
         try:
-            bom_df = read_bom_file(uploaded_file)
+            bom_df = _read_upload(uploaded_file.getvalue(), uploaded_file.name)
             bom_df = normalize_bom_columns(bom_df)
         except Exception as exc:
             st.error(f"Failed to read BOM file: {exc}")
@@ -285,180 +625,41 @@ with tab_bom:
 
         st.caption(f"Active suppliers: {', '.join(supplier_filter) if supplier_filter else 'None'}")
 
-        if st.button("Upload & Process"):
-            with st.spinner("Processing your BOM... this may take a moment"):
-                start = time.time()
-                with get_session() as session:
-                    results_df, suggestions_map = find_best_matches_for_bom(
-                        session=session,
-                        bom_df=bom_df,
-                        min_similarity=min_similarity,
-                        in_stock_only=in_stock_only,
-                        supplier_filter=supplier_filter,
-                    )
-                elapsed = time.time() - start
-            st.success(f"Processing done in {elapsed:.1f}s")
-
-            def similarity_color(val: Any) -> str:
-                try:
-                    v = float(val)
-                except Exception:
-                    return ""
-                if v >= 100:
-                    return "background-color: #DCFCE7"
-                if v >= 70:
-                    return "background-color: #FEF3C7"
-                return "background-color: #FEE2E2"
-
-            st.subheader("🔍 Available Matches")
-            available_df = results_df[results_df["Status"] == "Available"].copy()
-            if not available_df.empty:
-                st.dataframe(
-                    available_df.style.applymap(similarity_color, subset=["Similarity %"]),
-                    use_container_width=True,
-                    column_config={
-                        "Image": st.column_config.ImageColumn("Image", help="Product image", width="small"),
-                        "Datasheet Link": st.column_config.LinkColumn("Datasheet Link"),
-                        "Purchase Link": st.column_config.LinkColumn("Purchase Link"),
-                    },
-                )
-            else:
-                st.caption("No direct matches found above the similarity threshold.")
-
-            st.subheader("❌ Unavailable in Store")
-            unavailable_df = results_df[results_df["Status"] == "Unavailable"].copy()
-            if not unavailable_df.empty:
-                st.dataframe(
-                    unavailable_df[["BOM Part Name", "Similarity %", "Status"]],
-                    use_container_width=True,
-                )
+        # Results live in session_state so reruns from other widgets reuse them while the inputs match
+        bom_key = (
+            hashlib.blake2b(uploaded_file.getvalue(), digest_size=8).hexdigest(),
+            min_similarity,
+            in_stock_only,
+            tuple(sorted(supplier_filter)),
+        )
+        # Matching runs on a worker thread (like the scraper runs) so the page stays interactive;
+        # bom_job holds the thread's _BomJob until its results are copied into bom_results
+        job = _collect_bom_job()
+        job_error = job.snapshot()[1] if job is not None else None
+        running = job is not None and job.bom_key == bom_key and job_error is None
+        if st.button("Upload & Process", disabled=running) and not running:
+            with get_session() as session:
+                catalog_key = catalog_version(session)
+            st.session_state["bom_job"] = job = _BomJob(bom_key)
+            job_error, running = None, True
+            threading.Thread(target=_process_bom_job, args=(job, bom_df, catalog_key), daemon=True).start()
 
-            # Suggestions with add-to-available capability
-            st.subheader("▼ Suggestions (Unique Alternatives)")
-            seen = set()
-            unique_rows = []
-            for _, suggestions in suggestions_map.items():
-                for srow in suggestions:
-                    key = (srow.get("supplier"), srow.get("found_part_name"), srow.get("purchase_link"))
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    unique_rows.append(srow)
-            if unique_rows:
-                suggestions_df = pd.DataFrame(unique_rows)
-                if not suggestions_df.empty:
-                    suggestions_df = suggestions_df[[
-                        "found_part_name",
-                        "supplier",
-                        "price",
-                        "stock",
-                        "image",
-                        "datasheet_link",
-                        "purchase_link",
-                        "similarity",
-                    ]]
-                    suggestions_df.rename(columns={
-                        "found_part_name": "Found Part Name",
-                        "supplier": "Supplier",
-                        "price": "Price",
-                        "stock": "Stock Availability",
-                        "image": "Image",
-                        "datasheet_link": "Datasheet Link",
-                        "purchase_link": "Purchase Link",
-                        "similarity": "Similarity %",
-                    }, inplace=True)
-                st.dataframe(
-                    suggestions_df.style.applymap(similarity_color, subset=["Similarity %"]),
-                    use_container_width=True,
-                    column_config={
-                        "Image": st.column_config.ImageColumn("Image", help="Product image", width="small"),
-                        "Datasheet Link": st.column_config.LinkColumn("Datasheet Link"),
-                        "Purchase Link": st.column_config.LinkColumn("Purchase Link"),
-                    },
-                )
-                # Add one of the suggestions to Available Matches
-                with st.form("add_suggestion_form"):
-                    st.caption("Add a suggested item to Available Matches")
-                    sel_idx = st.selectbox(
-                        "Choose suggestion",
-                        options=list(range(len(suggestions_df))),
-                        format_func=lambda i: f"{suggestions_df.iloc[i]['Found Part Name']} ({suggestions_df.iloc[i]['Supplier']})",
-                    )
-                    add_submit = st.form_submit_button("Add to Available")
-                    if add_submit:
-                        row = suggestions_df.iloc[int(sel_idx)].to_dict()
-                        # Construct a new available row with minimal required fields
-                        new_row = {
-                            "Status": "Available",
-                            "BOM Part Name": row.get("Found Part Name"),
-                            "Found Part Name": row.get("Found Part Name"),
-                            "Supplier": row.get("Supplier"),
-                            "Price": row.get("Price"),
-                            "Stock Availability": row.get("Stock Availability"),
-                            "Image": row.get("Image"),
-                            "Datasheet Link": row.get("Datasheet Link"),
-                            "Purchase Link": row.get("Purchase Link"),
-                            "Similarity %": row.get("Similarity %", 0.0),
-                        }
-                        results_df = pd.concat([results_df, pd.DataFrame([new_row])], ignore_index=True)
-                        st.success("Suggestion added to Available Matches. Exports will include it.")
-            else:
-                st.caption("No alternative suggestions available.")
-
-            csv_bytes = dataframe_to_download_bytes(results_df, kind="csv")
-            xlsx_bytes = dataframe_to_download_bytes(results_df, kind="xlsx")
-            from app.budget_excel import build_budget_excel
-            budget_xlsx = build_budget_excel(bom_df=bom_df, results_df=results_df)
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.download_button("⬇ Download CSV", data=csv_bytes, file_name="bom_results.csv", mime="text/csv")
-            with col2:
-                st.download_button("⬇ Download Excel", data=xlsx_bytes, file_name="bom_results.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-            with col3:
-                st.download_button("📊 Download Budget Excel", data=budget_xlsx, file_name="bom_budget.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        if running:
+            _bom_job_status(bom_key)
+        elif job is not None and job.bom_key == bom_key:
+            st.error(f"Failed to process BOM: {job_error}")
+
+        _render_bom_results(bom_df, bom_key)
 
 with tab_inventory:
     st.subheader("Inventory by Supplier")
-    with get_session() as session:
-        inv_supplier_names = [s.name for s in session.query(Supplier).order_by(Supplier.name).all()]
+    inv_supplier_names = [s["name"] for s in load_suppliers()]
     sel_inv = st.multiselect("Suppliers", options=inv_supplier_names, default=inv_supplier_names)
     page_size = st.number_input("Page size", min_value=25, max_value=1000, value=100, step=25)
     page_num = st.number_input("Page", min_value=1, value=1, step=1)
 
-    def _primary_price(price_json: Optional[str]) -> Optional[str]:
-        if not price_json:
-            return None
-        try:
-            tiers = json.loads(price_json)
-            if isinstance(tiers, list) and tiers:
-                return tiers[0].get("price") or tiers[0].get("unit_price")
-        except Exception:
-            return None
-        return None
-
-    with get_session() as session:
-        q = session.query(Part, Supplier.name.label("supplier_name")).join(Supplier)
-        if sel_inv:
-            q = q.filter(Supplier.name.in_(sel_inv))
-        total = q.count()
-        offset = (int(page_num) - 1) * int(page_size)
-        rows_q = q.order_by(Part.id.desc()).offset(offset).limit(int(page_size)).all()
-
-    items = []
-    for part, sup_name in rows_q:
-        items.append({
-            "Supplier": sup_name,
-            "Part Number": part.part_number,
-            "Name": part.name,
-            "Description": part.description,
-            "Stock": part.stock,
-            "Price": _primary_price(part.price_tiers_json),
-            "Datasheet": part.datasheet_url,
-            "Purchase": part.purchase_url,
-            "Image": part.image_url,
-        })
+    total, inv_df = _inventory_page(tuple(sel_inv), int(page_num), int(page_size))
     st.caption(f"Total items: {total}")
-    inv_df = pd.DataFrame(items)
     st.dataframe(
         inv_df,
         use_container_width=True,
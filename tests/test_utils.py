@@ -0,0 +1,34 @@
+import pandas as pd
+
+from app.utils import match_bom_to_parts_list
+
+
+def _parts_list() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Name": ["Red LED 5mm", "10k Resistor"],
+            "Description": ["5mm through hole led", "1/4w carbon film"],
+            "Code": ["LED-R5", "RES-10K"],
+            "Price": ["Rs 10", "Rs 2"],
+        }
+    )
+
+
+def test_match_bom_to_parts_list_empty_bom_returns_empty_frames():
+    # A header-only BOM file reads as zero rows
+    bom_df = pd.DataFrame(columns=["Part_Name", "Description", "Quantity", "Package", "Voltage", "Other_Specs"])
+
+    matched_df, updated_bom_df = match_bom_to_parts_list(bom_df, _parts_list())
+
+    assert matched_df.empty
+    assert updated_bom_df.empty
+
+
+def test_match_bom_to_parts_list_picks_best_part():
+    bom_df = pd.DataFrame({"Part_Name": ["red led"], "Description": ["5mm led"], "Quantity": [4]})
+
+    matched_df, updated_bom_df = match_bom_to_parts_list(bom_df, _parts_list())
+
+    assert matched_df["Code"].tolist() == ["LED-R5"]
+    assert updated_bom_df["Matched_Code"].tolist() == ["LED-R5"]
+    assert updated_bom_df["Quantity"].tolist() == [4]